@@ -0,0 +1,90 @@
+import argparse
+import itertools
+import torch
+from transformers import T5ForConditionalGeneration, T5Tokenizer
+
+from common import build_contexts, load_text, timed
+from Generator.encoding import DecodingPolicy, bucketed_generate
+from Generator.mcq import normalized_levenshtein_distances
+
+# Candidate policies, cheapest first. Each prompt asks for --num_return questions, so beam
+# widths below that are skipped.
+POLICIES = {
+    'greedy': DecodingPolicy('greedy'),
+    'greedy_capped': DecodingPolicy('greedy', length_ratio=1.0),
+    'beam2': DecodingPolicy('beam', num_beams=2, no_repeat_ngram_size=2),
+    'beam4': DecodingPolicy('beam', num_beams=4, no_repeat_ngram_size=2),
+    'beam4_capped': DecodingPolicy('beam', num_beams=4, no_repeat_ngram_size=2, length_ratio=1.0),
+    'beam10': DecodingPolicy('beam', num_beams=10, no_repeat_ngram_size=2),
+    'sample': DecodingPolicy('sample', top_k=40, top_p=0.8, no_repeat_ngram_size=2),
+}
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Latency against question diversity for each decoding policy')
+    parser.add_argument('--file', '-f', help='Text file to build prompts from (defaults to the sample passage)')
+    parser.add_argument('--model', default='Roasters/Boolean-Questions')
+    parser.add_argument('--tokenizer', default='t5-base')
+    parser.add_argument('--prompts', choices=['boolq', 'mcq'], default='boolq',
+                        help='truefalse prompts, one per sentence, or MCQ context/answer prompts')
+    parser.add_argument('--num_return', type=int, default=1, help='Questions requested per prompt')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--policies', nargs='*', default=list(POLICIES), choices=list(POLICIES))
+    return parser.parse_args()
+
+
+def build_prompts(text, kind):
+    if kind == 'mcq':
+        return build_contexts(text)
+    from Generator.mcq import tokenize_into_sentences
+    return ["truefalse: %s passage: %s </s>" % (sentence, answer)
+            for sentence, answer in zip(tokenize_into_sentences(text), itertools.cycle([True, False]))]
+
+
+def distinct_n(questions, n):
+    """Share of distinct word n-grams over all generated questions."""
+    ngrams = [tuple(words[i:i + n]) for words in (q.lower().split() for q in questions) for i in range(len(words) - n + 1)]
+    return len(set(ngrams)) / len(ngrams) if ngrams else 0.0
+
+
+def mean_pairwise_distance(groups):
+    """Mean normalized Levenshtein distance between the questions generated for the same prompt."""
+    distances = []
+    for group in groups:
+        for i, question in enumerate(group[:-1]):
+            distances.extend(normalized_levenshtein_distances(question.lower(), [q.lower() for q in group[i + 1:]]))
+    return sum(distances) / len(distances) if distances else float('nan')
+
+
+def main():
+    args = parse_arguments()
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    tokenizer = T5Tokenizer.from_pretrained(args.tokenizer)
+    model = T5ForConditionalGeneration.from_pretrained(args.model).to(device).eval()
+    prompts = build_prompts(load_text(args.file), args.prompts)
+    print(f'{len(prompts)} prompts, {args.num_return} question(s) each')
+
+    for name in args.policies:
+        policy = POLICIES[name]
+        limit = policy.max_return_sequences()
+        if limit is not None and limit < args.num_return:
+            continue
+
+        def generate():
+            torch.manual_seed(42)
+            outputs = bucketed_generate(prompts, tokenizer, model, device, policy=policy, num_return_sequences=args.num_return)
+            if args.num_return == 1:
+                outputs = [[output] for output in outputs]
+            return [[tokenizer.decode(o, skip_special_tokens=True).strip() for o in group] for group in outputs]
+
+        generate()  # warm-up
+        groups, seconds = timed(generate, args.repeat)
+        questions = [q for group in groups for q in group]
+        tokens = sum(len(tokenizer(q)["input_ids"]) for q in questions)
+        print(f'{name:>14}: {seconds:.3f}s, {1000 * seconds / len(questions):.1f} ms/question, '
+              f'{tokens / len(questions):.1f} tokens/question, distinct-1 {distinct_n(questions, 1):.3f}, '
+              f'distinct-2 {distinct_n(questions, 2):.3f}, within-prompt distance {mean_pairwise_distance(groups):.3f}')
+
+
+if __name__ == '__main__':
+    main()
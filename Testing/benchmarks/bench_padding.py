@@ -0,0 +1,49 @@
+import argparse
+import torch
+from transformers import T5ForConditionalGeneration, T5Tokenizer
+
+from common import build_contexts, load_text, timed
+from Generator.encoding import encode_in_buckets
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Compare pad-to-512 encoding with length-bucketed padding')
+    parser.add_argument('--file', '-f', help='Text file to build keyword contexts from (defaults to the sample passage)')
+    parser.add_argument('--copies', type=int, default=8, help='How many times to repeat the contexts to form a larger batch')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--bucket_size', type=int, default=16)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    tokenizer = T5Tokenizer.from_pretrained('t5-large')
+    model = T5ForConditionalGeneration.from_pretrained('Roasters/Question-Generator').to(device).eval()
+
+    contexts = build_contexts(load_text(args.file), args.copies)
+    real_tokens = sum(len(ids) for ids in tokenizer(contexts)["input_ids"])
+
+    @torch.no_grad()
+    def padded():
+        encoding = tokenizer(contexts, padding='max_length', max_length=512, truncation=True, return_tensors='pt').to(device)
+        model.encoder(input_ids=encoding["input_ids"], attention_mask=encoding["attention_mask"])
+        return encoding["input_ids"].numel()
+
+    @torch.no_grad()
+    def bucketed():
+        processed = 0
+        for _, input_ids, attention_mask in encode_in_buckets(contexts, tokenizer, device, args.bucket_size):
+            model.encoder(input_ids=input_ids, attention_mask=attention_mask)
+            processed += input_ids.numel()
+        return processed
+
+    print(f'{len(contexts)} inputs, {real_tokens} real tokens')
+    for name, fn in [('pad_to_max_length', padded), ('bucketed', bucketed)]:
+        processed, seconds = timed(fn, args.repeat)
+        print(f'{name:>18}: {processed:>7} tokens encoded, {seconds:.3f}s, '
+              f'{real_tokens / seconds:,.0f} useful tokens/s, {100 * real_tokens / processed:.1f}% non-padding')
+
+
+if __name__ == '__main__':
+    main()
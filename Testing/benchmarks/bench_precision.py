@@ -0,0 +1,80 @@
+import sys
+import json
+import argparse
+import difflib
+import resource
+import subprocess
+
+from common import build_contexts, load_text, timed
+
+MODES = ['fp32', 'bf16', 'int8']
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Latency, memory and accuracy of each precision mode against fp32')
+    parser.add_argument('--file', '-f', help='Fixed corpus to generate from (defaults to the sample passage)')
+    parser.add_argument('--model', default='Roasters/Question-Generator')
+    parser.add_argument('--tokenizer', default='t5-large')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min_similarity', type=float, default=0.9,
+                        help='Fail if a mode\'s mean similarity to the fp32 questions drops below this')
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def run_mode(args):
+    # Runs in its own process so peak RSS belongs to this mode alone
+    from Generator.registry import ModelHandle
+    from Generator.encoding import bucketed_generate
+    import torch
+
+    device = torch.device('cpu')
+    models = ModelHandle()
+    tokenizer = models.t5_tokenizer(args.tokenizer)
+    model = models.t5_model(args.model, device, args.mode)
+    contexts = build_contexts(load_text(args.file))
+
+    def generate():
+        outputs = bucketed_generate(contexts, tokenizer, model, device, max_length=150)
+        return [tokenizer.decode(o, skip_special_tokens=True) for o in outputs]
+
+    generate()  # warm-up
+    questions, seconds = timed(generate, args.repeat)
+    print(json.dumps({
+        'questions': questions,
+        'seconds': seconds,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def main():
+    args = parse_arguments()
+    if args.mode:
+        run_mode(args)
+        return
+
+    results = {}
+    for mode in MODES:
+        command = [sys.executable, __file__, '--mode', mode, '--model', args.model,
+                   '--tokenizer', args.tokenizer, '--repeat', str(args.repeat)]
+        if args.file:
+            command += ['--file', args.file]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    reference = results['fp32']['questions']
+    failed = False
+    for mode, result in results.items():
+        ratios = [difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(reference, result['questions'])]
+        similarity = sum(ratios) / len(ratios) if ratios else 1.0
+        exact = sum(a == b for a, b in zip(reference, result['questions']))
+        ok = similarity >= args.min_similarity
+        failed = failed or not ok
+        print(f'{mode:>5}: {result["seconds"]:.3f}s per pass, peak RSS {result["peak_rss_mb"]:.0f} MB, '
+              f'{exact}/{len(reference)} identical, mean similarity {similarity:.3f} {"ok" if ok else "BELOW GUARD"}')
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import os
+import argparse
+import tempfile
+
+from common import timed
+from Generator.frequency import FrequencyTable, build_frequency_table
+
+SAMPLE_WORDS = ['the', 'intelligence', 'learning', 'data', 'machine learning', 'robotics', 'The', 'AI']
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Compare FreqDist(brown.words()) with loading the prebuilt table')
+    parser.add_argument('--table', help='Existing frequency table directory (built into a temp dir if omitted)')
+    parser.add_argument('--repeat', type=int, default=3)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    from nltk import FreqDist
+    from nltk.corpus import brown
+
+    table_path = args.table
+    if table_path is None:
+        table_path = os.path.join(tempfile.mkdtemp(), 'brown_freq')
+        build_frequency_table(table_path)
+
+    fdist, fdist_seconds = timed(lambda: FreqDist(brown.words()), args.repeat)
+    table, table_seconds = timed(lambda: FrequencyTable(table_path), args.repeat)
+
+    for word in SAMPLE_WORDS:
+        assert fdist[word] == table[word], f'Count mismatch for {word!r}'
+
+    print(f'FreqDist(brown.words()): {fdist_seconds:.3f}s')
+    print(f'FrequencyTable load:     {1000 * table_seconds:.3f}ms ({len(table)} words)')
+    print(f'cold-boot time saved per generator: {fdist_seconds - table_seconds:.3f}s')
+
+
+if __name__ == '__main__':
+    main()
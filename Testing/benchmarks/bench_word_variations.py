@@ -0,0 +1,60 @@
+import argparse
+import random
+import string
+
+from common import timed
+from Generator.mcq import generate_word_variations, is_one_edit_away
+
+ANSWERS = [
+    "deep learning",
+    "natural language processing",
+    "convolutional neural network architectures",
+    "the acquisition of information and rules for using the information",
+    "privacy concerns with data collection and the impact of artificial intelligence",
+]
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Compare the edit-set membership test with is_one_edit_away')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--candidates', type=int, default=15, help='Candidates compared per answer, like most_similar(n=15)')
+    return parser.parse_args()
+
+
+def make_candidates(answer, count):
+    # Half near misses, half unrelated phrases, as sense2vec neighbours tend to be
+    rng = random.Random(answer)
+    letters = string.ascii_lowercase + ' '
+    candidates = []
+    for i in range(count):
+        if i % 2 == 0:
+            pos = rng.randrange(len(answer))
+            candidates.append(answer[:pos] + rng.choice(letters) + answer[pos + 1:])
+        else:
+            candidates.append(''.join(rng.choice(letters) for _ in range(len(answer))))
+    return candidates
+
+
+def main():
+    args = parse_arguments()
+    for answer in ANSWERS:
+        candidates = make_candidates(answer, args.candidates)
+
+        def edit_set():
+            variations = generate_word_variations(answer)
+            return [c not in variations for c in candidates], len(variations)
+
+        def comparator():
+            return [not is_one_edit_away(answer, c) for c in candidates]
+
+        (old_result, set_size), old_seconds = timed(edit_set, args.repeat)
+        new_result, new_seconds = timed(comparator, args.repeat)
+        assert old_result == new_result, f'Mismatch for {answer!r}'
+
+        print(f'{len(answer):>3} chars, {set_size:>6} variations: '
+              f'edit set {1000 * old_seconds:8.3f} ms, comparator {1000 * new_seconds:6.3f} ms, '
+              f'{old_seconds / new_seconds:6.0f}x faster')
+
+
+if __name__ == '__main__':
+    main()
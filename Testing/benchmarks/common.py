@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+# Same passage the backend endpoint tests use
+SAMPLE_TEXT = '''
+    Artificial intelligence (AI) is the simulation of human intelligence processes 
+    by machines, especially computer systems. These processes include learning 
+    (the acquisition of information and rules for using the information), reasoning 
+    (using rules to reach approximate or definite conclusions), and self-correction.
+    
+    AI applications include speech recognition, natural language processing, 
+    machine vision, expert systems, and robotics. Machine learning, a subset of AI, 
+    focuses on the development of algorithms that can learn from and make predictions 
+    or decisions based on data.
+    
+    Deep learning, a technique within machine learning, involves neural networks 
+    with many layers (hence the term "deep"). It has revolutionized AI by enabling 
+    complex pattern recognition and data processing tasks.
+    
+    Ethical considerations in AI include issues of bias in algorithms, privacy concerns 
+    with data collection, and the impact of AI on jobs and society as a whole.
+'''
+
+
+def load_text(path=None):
+    if path is None:
+        return SAMPLE_TEXT
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def build_contexts(text, copies=1):
+    """Builds MCQ-style prompts, one short context per answer, from the sentences of text."""
+    from Generator.mcq import tokenize_into_sentences
+
+    contexts = []
+    for sentence in tokenize_into_sentences(text):
+        answer = max(sentence.split(), key=len)
+        contexts.append("context: " + sentence + " " + "answer: " + answer + " </s>")
+    return contexts * copies
+
+
+def timed(fn, repeat=1):
+    """Runs fn repeat times and returns (last result, mean seconds per run)."""
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start_time) / repeat
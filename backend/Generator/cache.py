@@ -0,0 +1,127 @@
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+class ResultCache:
+    """Two-tier cache for generated question sets.
+
+    The first tier is an in-memory LRU of at most max_entries results. If disk_path
+    is given, results are also written to a SQLite file that survives restarts and
+    is shared between worker processes; it is trimmed to max_disk_entries rows by
+    least-recent access. Entries older than ttl seconds are treated as misses.
+    """
+
+    def __init__(self, max_entries=256, disk_path=None, max_disk_entries=10000, ttl=None):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, value TEXT, created REAL, accessed REAL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(endpoint, input_text, version, **params):
+        """Hashes the normalized input text together with the endpoint, the request
+        parameters that shape the output and the model version.
+        """
+        payload = json.dumps(
+            {"endpoint": endpoint, "text": normalize_text(input_text), "version": version, "params": params},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if not self._expired(created):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None and not self._expired(row[1]):
+                    self._db.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now),
+                )
+                self._evict_disk()
+                self._db.commit()
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM results WHERE created < ?", (time.time() - self.ttl,))
+        self._db.execute(
+            "DELETE FROM results WHERE key NOT IN "
+            "(SELECT key FROM results ORDER BY accessed DESC LIMIT ?)",
+            (self.max_disk_entries,),
+        )
+
+    def stats(self):
+        with self._lock:
+            disk_entries = None
+            if self._db is not None:
+                disk_entries = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
@@ -1,37 +1,177 @@
+import os
+import json
+import math
 import torch
 from transformers import T5ForConditionalGeneration,T5Tokenizer
 
+BUCKET_SIZE = int(os.environ.get("EDUAID_BUCKET_SIZE", 16))
+MAX_INPUT_LENGTH = 512
+DECODING_STRATEGIES = ("greedy", "beam", "sample")
+# Input-length caps are rounded up to this grid so that concurrent requests end up with the
+# same generate arguments and the BatchScheduler can still merge them
+LENGTH_CAP_GRID = 32
+
+
+class DecodingPolicy:
+  """How a generator decodes: greedy, beam search over num_beams beams, or top-k/top-p
+  sampling. At most max_new_tokens tokens are generated. With length_ratio set, the cap is
+  also length_ratio * input tokens + length_offset, rounded up to a multiple of
+  LENGTH_CAP_GRID, so short inputs stop decoding early.
+  """
+
+  FIELDS = ("strategy", "num_beams", "top_k", "top_p", "temperature", "max_new_tokens",
+            "length_ratio", "length_offset", "no_repeat_ngram_size")
+
+  def __init__ (self,strategy="greedy",num_beams=1,top_k=40,top_p=0.8,temperature=1.0,max_new_tokens=255,
+                length_ratio=None,length_offset=16,no_repeat_ngram_size=0):
+    if strategy not in DECODING_STRATEGIES:
+      raise ValueError(f"Invalid decoding strategy {strategy}. Please choose from {DECODING_STRATEGIES}")
+    if int(num_beams) < 1 or int(max_new_tokens) < 1 or int(top_k) < 0 or not 0 < float(top_p) <= 1 or float(temperature) <= 0:
+      raise ValueError("num_beams and max_new_tokens must be positive, top_k non-negative, top_p in (0, 1] and temperature positive")
+    if length_ratio is not None and float(length_ratio) <= 0:
+      raise ValueError("length_ratio must be positive")
+    self.strategy = strategy
+    self.num_beams = int(num_beams)
+    self.top_k = int(top_k)
+    self.top_p = float(top_p)
+    self.temperature = float(temperature)
+    self.max_new_tokens = int(max_new_tokens)
+    self.length_ratio = None if length_ratio is None else float(length_ratio)
+    self.length_offset = int(length_offset)
+    self.no_repeat_ngram_size = int(no_repeat_ngram_size)
+
+  def to_dict (self):
+    return {field: getattr(self, field) for field in self.FIELDS}
+
+  def replace (self,**overrides):
+    """Returns a copy with overrides applied, e.g. the "decoding" object of a request."""
+    unknown = set(overrides) - set(self.FIELDS)
+    if unknown:
+      raise ValueError(f"Unknown decoding options {sorted(unknown)}. Please choose from {list(self.FIELDS)}")
+    return DecodingPolicy(**dict(self.to_dict(), **overrides))
+
+  def max_return_sequences (self):
+    """How many sequences one prompt can return: num_beams for beam search, one for greedy
+    decoding, and None (no limit) for sampling."""
+    return {"greedy": 1, "beam": self.num_beams, "sample": None}[self.strategy]
+
+  def max_new_tokens_for (self,input_length):
+    if self.length_ratio is None:
+      return self.max_new_tokens
+    cap = math.ceil(self.length_ratio * input_length) + self.length_offset
+    return max(1, min(self.max_new_tokens, math.ceil(cap / LENGTH_CAP_GRID) * LENGTH_CAP_GRID))
+
+  def generate_kwargs (self,input_length):
+    kwargs = {"max_new_tokens": self.max_new_tokens_for(input_length)}
+    if self.strategy == "beam":
+      kwargs.update(num_beams=self.num_beams, early_stopping=True)
+    elif self.strategy == "sample":
+      kwargs.update(do_sample=True, top_k=self.top_k, top_p=self.top_p, temperature=self.temperature)
+    if self.no_repeat_ngram_size:
+      kwargs["no_repeat_ngram_size"] = self.no_repeat_ngram_size
+    return kwargs
+
+  def __repr__ (self):
+    return f"DecodingPolicy({self.to_dict()})"
+
+
+# Per-generator defaults. max_new_tokens is the old max_length minus the decoder start token.
+DEFAULT_POLICIES = {
+  "mcq": DecodingPolicy("greedy", max_new_tokens=149, length_ratio=1.0),
+  "shortq": DecodingPolicy("greedy", max_new_tokens=149, length_ratio=1.0),
+  "boolq": DecodingPolicy("beam", num_beams=10, max_new_tokens=255, length_ratio=1.0, no_repeat_ngram_size=2),
+  # many short sentence-anchored prompts, so a narrow beam each
+  "boolq_anchored": DecodingPolicy("beam", num_beams=2, max_new_tokens=63, length_ratio=1.0, no_repeat_ngram_size=2),
+  "paraphrase": DecodingPolicy("beam", num_beams=50, max_new_tokens=49, no_repeat_ngram_size=2),
+}
+
+
+def policy_for (component):
+  """Default decoding policy of component, overridden by EDUAID_DECODING_<COMPONENT> given as
+  JSON, e.g. EDUAID_DECODING_BOOLQ='{"num_beams": 4}'.
+  """
+  policy = DEFAULT_POLICIES[component]
+  override = os.environ.get(f"EDUAID_DECODING_{component.upper()}")
+  if override:
+    policy = policy.replace(**json.loads(override))
+  return policy
+
+
+def request_policy (policy,payload):
+  """policy with the "decoding" overrides of a request payload applied, if it has any."""
+  return policy.replace(**payload["decoding"]) if payload.get("decoding") else policy
+
+
+def _split_buckets (order,lengths,bucket_size,max_tokens):
+  bucket = []
+  for i in order:
+    # order is ascending, so lengths[i] is the padded width of the bucket if i joins it
+    if bucket and (len(bucket) >= bucket_size or (max_tokens and (len(bucket) + 1) * lengths[i] > max_tokens)):
+      yield bucket
+      bucket = []
+    bucket.append(i)
+  if bucket:
+    yield bucket
+
+
+def encode_in_buckets (texts,tokenizer,device,bucket_size=BUCKET_SIZE,max_input_length=MAX_INPUT_LENGTH,max_tokens=None):
+  """Tokenizes texts once, sorts them by token length and pads each bucket only to its own
+  longest member. A bucket holds at most bucket_size rows and, if max_tokens is set, at most
+  max_tokens padded tokens. Yields (indices, input_ids, attention_mask), where indices are the
+  positions of the bucket rows in texts.
+  """
+  token_ids = tokenizer(texts, truncation=True, max_length=max_input_length)["input_ids"]
+  lengths = [len(ids) for ids in token_ids]
+  order = sorted(range(len(texts)), key=lambda i: lengths[i])
+  for indices in _split_buckets(order, lengths, bucket_size, max_tokens):
+    encoding = tokenizer.pad({"input_ids": [token_ids[i] for i in indices]}, padding="longest", return_tensors="pt")
+    yield indices, encoding["input_ids"].to(device), encoding["attention_mask"].to(device)
+
+
+def iter_bucketed_generate (texts,tokenizer,model,device,bucket_size=BUCKET_SIZE,max_input_length=MAX_INPUT_LENGTH,max_tokens=None,policy=None,**generate_kwargs):
+  """Runs model.generate over length-bucketed batches and yields (index, output) pairs as each
+  bucket finishes, where index is the position of the input in texts. With
+  num_return_sequences > 1 each output holds that many sequences. If policy is given, its
+  decoding arguments for the bucket's input length are added to generate_kwargs.
+  """
+  per_text = generate_kwargs.get("num_return_sequences", 1)
+  for indices, input_ids, attention_mask in encode_in_buckets(texts, tokenizer, device, bucket_size, max_input_length, max_tokens):
+    kwargs = dict(policy.generate_kwargs(input_ids.shape[1]), **generate_kwargs) if policy else generate_kwargs
+    with torch.no_grad():
+      generated = model.generate(input_ids=input_ids, attention_mask=attention_mask, **kwargs)
+    for row, index in enumerate(indices):
+      yield index, generated[row] if per_text == 1 else generated[row * per_text:(row + 1) * per_text]
+
+
+def bucketed_generate (texts,tokenizer,model,device,bucket_size=BUCKET_SIZE,max_input_length=MAX_INPUT_LENGTH,max_tokens=None,policy=None,**generate_kwargs):
+  """Runs model.generate over length-bucketed batches and returns the outputs in the original
+  order of texts.
+  """
+  outputs = [None] * len(texts)
+  for index, output in iter_bucketed_generate(texts, tokenizer, model, device, bucket_size, max_input_length, max_tokens, policy, **generate_kwargs):
+    outputs[index] = output
+  return outputs
+
+
+
+def policy_decoding (inp_ids,attn_mask,model,tokenizer,policy,num=1):
+  """Decodes num questions per input with policy and returns them stripped and capitalized."""
+  input_length = int(attn_mask.sum(dim=1).max())
+  outputs = model.generate(input_ids=inp_ids, attention_mask=attn_mask, num_return_sequences=num,
+                           **policy.generate_kwargs(input_length))
+  Questions = [tokenizer.decode(out, skip_special_tokens=True, clean_up_tokenization_spaces=True) for out in outputs]
+  return [Question.strip().capitalize() for Question in Questions]
+
 
 def greedy_decoding (inp_ids,attn_mask,model,tokenizer):
-  greedy_output = model.generate(input_ids=inp_ids, attention_mask=attn_mask, max_length=256)
-  Question =  tokenizer.decode(greedy_output[0], skip_special_tokens=True,clean_up_tokenization_spaces=True)
-  return Question.strip().capitalize()
+  return policy_decoding(inp_ids, attn_mask, model, tokenizer, DecodingPolicy("greedy"))[0]
 
 
 def beam_search_decoding (inp_ids,attn_mask,model,tokenizer,num):
-  beam_output = model.generate(input_ids=inp_ids,
-                                 attention_mask=attn_mask,
-                                 max_length=256,
-                               num_beams=10,
-                               num_return_sequences=num,
-                               no_repeat_ngram_size=2,
-                               early_stopping=True
-                               )
-  Questions = [tokenizer.decode(out, skip_special_tokens=True, clean_up_tokenization_spaces=True) for out in
-               beam_output]
-  return [Question.strip().capitalize() for Question in Questions]
+  policy = DecodingPolicy("beam", num_beams=10, no_repeat_ngram_size=2)
+  return policy_decoding(inp_ids, attn_mask, model, tokenizer, policy, num)
 
 
 def topkp_decoding (inp_ids,attn_mask,model,tokenizer):
-  topkp_output = model.generate(input_ids=inp_ids,
-                                 attention_mask=attn_mask,
-                                 max_length=256,
-                               do_sample=True,
-                               top_k=40,
-                               top_p=0.80,
-                               num_return_sequences=3,
-                                no_repeat_ngram_size=2,
-                                early_stopping=True
-                               )
-  Questions = [tokenizer.decode(out, skip_special_tokens=True,clean_up_tokenization_spaces=True) for out in topkp_output]
-  return [Question.strip().capitalize() for Question in Questions]
+  policy = DecodingPolicy("sample", top_k=40, top_p=0.80, no_repeat_ngram_size=2)
+  return policy_decoding(inp_ids, attn_mask, model, tokenizer, policy, 3)
@@ -0,0 +1,71 @@
+import os
+import json
+import argparse
+import numpy as np
+
+FORMAT_VERSION = 1
+DEFAULT_TABLE_PATH = os.environ.get("EDUAID_FREQ_TABLE", "brown_freq")
+
+
+def build_frequency_table(output, corpus="brown"):
+    """Counts the words of an NLTK corpus once and writes them as a sorted word table plus a
+    parallel count array, the same data FreqDist(brown.words()) builds at every startup.
+    """
+    import nltk
+    from nltk import FreqDist
+
+    reader = getattr(nltk.corpus, corpus)
+    fdist = FreqDist(reader.words())
+    words = sorted(fdist.keys(), key=lambda w: w.encode("utf-8"))
+
+    os.makedirs(output, exist_ok=True)
+    np.save(os.path.join(output, "words.npy"), np.array([w.encode("utf-8") for w in words]))
+    np.save(os.path.join(output, "counts.npy"), np.array([fdist[w] for w in words], dtype=np.int64))
+    with open(os.path.join(output, "meta.json"), "w") as f:
+        json.dump({"version": FORMAT_VERSION, "corpus": corpus, "words": len(words), "total": fdist.N()}, f)
+
+
+class FrequencyTable:
+    """Memory-mapped, read-only replacement for the FreqDist lookups in identify_keywords.
+    Missing words count as 0, like FreqDist.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported frequency table version in {path}: {self.meta.get('version')}")
+        self.words = np.load(os.path.join(path, "words.npy"), mmap_mode="r")
+        self.counts = np.load(os.path.join(path, "counts.npy"), mmap_mode="r")
+
+    @property
+    def nbytes(self):
+        return self.words.nbytes + self.counts.nbytes
+
+    def __getitem__(self, word):
+        encoded = word.encode("utf-8")
+        i = int(np.searchsorted(self.words, encoded))
+        if i < len(self.words) and self.words[i] == encoded:
+            return int(self.counts[i])
+        return 0
+
+    def __contains__(self, word):
+        return self[word] > 0
+
+    def __len__(self):
+        return len(self.words)
+
+    def N(self):
+        return self.meta["total"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the prebuilt word frequency table")
+    parser.add_argument("--output", default=DEFAULT_TABLE_PATH, help="Directory to write the table to")
+    parser.add_argument("--corpus", default="brown", help="NLTK corpus to count")
+    args = parser.parse_args()
+    build_frequency_table(args.output, args.corpus)
+
+
+if __name__ == "__main__":
+    main()
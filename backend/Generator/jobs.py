@@ -0,0 +1,424 @@
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+import subprocess
+from contextlib import contextmanager
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+DEFAULT_QUEUE_PATH = os.environ.get("EDUAID_JOB_DB", "jobs.sqlite3")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobQueue:
+    """Persistent job queue in a SQLite file shared by the server and its worker processes.
+
+    Jobs are claimed highest priority first, then oldest first, inside an immediate
+    transaction so two workers never take the same job. Queued jobs are cancelled at
+    once; running jobs get a cancellation flag that the worker checks between stages.
+    Finished jobs are deleted ttl seconds after they finish.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH, ttl=None):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._transaction() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, payload TEXT, priority INTEGER, status TEXT, "
+                "cancel_requested INTEGER DEFAULT 0, result TEXT, error TEXT, worker TEXT, "
+                "created REAL, started REAL, finished REAL, timings TEXT)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, priority DESC, created)")
+
+    def _connect(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def submit(self, kind, payload, priority=0):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as db:
+            if self.ttl is not None:
+                db.execute(
+                    "DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished < ?",
+                    FINISHED + (now - self.ttl,),
+                )
+            db.execute(
+                "INSERT INTO jobs (id, kind, payload, priority, status, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), priority, QUEUED, now),
+            )
+        return job_id
+
+    def claim(self, worker):
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status = ? ORDER BY priority DESC, created LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = ?, worker = ?, started = ? WHERE id = ?",
+                (RUNNING, worker, time.time(), row[0]),
+            )
+        return {"id": row[0], "kind": row[1], "payload": json.loads(row[2])}
+
+    def finish(self, job_id, status, result=None, error=None, timings=None):
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, timings = ?, finished = ? WHERE id = ?",
+                (status, json.dumps(result), error, json.dumps(timings or {}), time.time(), job_id),
+            )
+
+    def cancel(self, job_id):
+        """Cancels a queued job or flags a running one, and returns the job's status afterwards."""
+        with self._transaction() as db:
+            row = db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row[0] == QUEUED:
+                db.execute(
+                    "UPDATE jobs SET status = ?, finished = ? WHERE id = ?", (CANCELLED, time.time(), job_id)
+                )
+                return CANCELLED
+            if row[0] == RUNNING:
+                db.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            return row[0]
+
+    def cancel_requested(self, job_id):
+        row = self._connect().execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def running_workers(self):
+        rows = self._connect().execute("SELECT DISTINCT worker FROM jobs WHERE status = ?", (RUNNING,))
+        return [row[0] for row in rows]
+
+    def requeue(self, worker):
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, started = NULL WHERE status = ? AND worker = ?",
+                (QUEUED, RUNNING, worker),
+            )
+
+    def fail_running(self, worker, error):
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished = ? WHERE status = ? AND worker = ?",
+                (FAILED, error, time.time(), RUNNING, worker),
+            )
+
+    def get(self, job_id, include_result=True):
+        row = self._connect().execute(
+            "SELECT id, kind, priority, status, cancel_requested, result, error, worker, created, started, "
+            "finished, timings FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        job_id, kind, priority, status, cancel_requested, result, error, worker, created, started, finished, timings = row
+
+        timings = json.loads(timings) if timings else {}
+        if started is not None:
+            timings["queue_wait"] = round(started - created, 4)
+        if started is not None and finished is not None:
+            timings["run"] = round(finished - started, 4)
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "priority": priority,
+            "status": status,
+            "cancel_requested": bool(cancel_requested),
+            "error": error,
+            "worker": worker,
+            "created": created,
+            "started": started,
+            "finished": finished,
+            "timings": timings,
+        }
+        if include_result and status == DONE:
+            job["result"] = json.loads(result)
+        return job
+
+    def counts(self):
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return dict(rows.fetchall())
+
+
+class JobContext:
+    """Passed to job handlers. Records how long each stage takes and stops the job at the
+    start of the next stage once a cancellation has been requested.
+    """
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        if self.queue.cancel_requested(self.job_id):
+            raise JobCancelled()
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(self.timings.get(name, 0) + time.time() - start_time, 4)
+
+
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    def decorator(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+def worker_models():
+    """Registers the generators a worker may need. They are built the first time a job uses
+    them and then stay loaded for the life of the worker process.
+    """
+    from Generator import main
+    from Generator.loader import ModelLoader
+
+    models = ModelLoader(block=True)
+    models.register("mcq", main.MCQGenerator)
+    models.register("shortq", main.ShortQGenerator)
+    models.register("boolq", main.BoolQGenerator)
+    models.register("qg", main.QuestionGenerator)
+    models.register("files", main.FileProcessor)
+    return models
+
+
+def _input_text(models, payload, ctx):
+    """Resolves the job's text: an uploaded file to ingest, a MediaWiki lookup, or the text itself."""
+    if payload.get("file_path"):
+        files = models.get("files")
+        if not files.is_upload(payload["file_path"]):
+            raise ValueError("file_path is not an uploaded file")
+        with ctx.stage("ingest"):
+            try:
+                return files.extract_text(payload["file_path"])
+            finally:
+                os.remove(payload["file_path"])
+    if int(payload.get("use_mediawiki", 0)) == 1:
+        from mediawikiapi import MediaWikiAPI
+        with ctx.stage("mediawiki"):
+            return MediaWikiAPI().summary(payload.get("input_text", ""), 8)
+    return payload.get("input_text", "")
+
+
+@job_handler("ingest")
+def run_ingest(models, payload, ctx):
+    return {"content": _input_text(models, payload, ctx)}
+
+
+@job_handler("mcq")
+def run_mcq(models, payload, ctx):
+    text = _input_text(models, payload, ctx)
+    with ctx.stage("load_models"):
+        generator = models.get("mcq")
+    with ctx.stage("generate"):
+        output = generator.generate_mcq({"input_text": text, "max_questions": int(payload.get("max_questions", 4)), "decoding": payload.get("decoding")})
+    return {"output": output["questions"]}
+
+
+@job_handler("boolq")
+def run_boolq(models, payload, ctx):
+    text = _input_text(models, payload, ctx)
+    with ctx.stage("load_models"):
+        generator = models.get("boolq")
+    with ctx.stage("generate"):
+        output = generator.generate_boolq({"input_text": text, "max_questions": int(payload.get("max_questions", 4)), "decoding": payload.get("decoding"), "mode": payload.get("mode")})
+    return {"output": output["Boolean_Questions"]}
+
+
+@job_handler("shortq")
+def run_shortq(models, payload, ctx):
+    text = _input_text(models, payload, ctx)
+    with ctx.stage("load_models"):
+        generator = models.get("shortq")
+    with ctx.stage("generate"):
+        output = generator.generate_shortq({"input_text": text, "max_questions": int(payload.get("max_questions", 4)), "decoding": payload.get("decoding")})
+    return {"output": output["questions"]}
+
+
+@job_handler("problems")
+def run_problems(models, payload, ctx):
+    text = _input_text(models, payload, ctx)
+    with ctx.stage("load_models"):
+        mcq, boolq, shortq = models.get("mcq"), models.get("boolq"), models.get("shortq")
+    with ctx.stage("analysis"):
+        analysis = mcq.analyze(text)
+    with ctx.stage("mcq"):
+        output_mcq = mcq.generate_mcq(
+            {"input_text": text, "max_questions": int(payload.get("max_questions_mcq", 4))}, analysis
+        )
+    with ctx.stage("boolq"):
+        output_boolq = boolq.generate_boolq(
+            {"input_text": text, "max_questions": int(payload.get("max_questions_boolq", 4))}, analysis
+        )
+    with ctx.stage("shortq"):
+        output_shortq = shortq.generate_shortq(
+            {"input_text": text, "max_questions": int(payload.get("max_questions_shortq", 4))}, analysis
+        )
+    return {"output_mcq": output_mcq, "output_boolq": output_boolq, "output_shortq": output_shortq}
+
+
+def _run_hard(models, payload, ctx, answer_style):
+    text = _input_text(models, payload, ctx)
+    with ctx.stage("load_models"):
+        generator = models.get("qg")
+    with ctx.stage("generate"):
+        output = generator.generate(
+            article=text, num_questions=payload.get("input_question", []), answer_style=answer_style
+        )
+    return {"output": output}
+
+
+@job_handler("shortq_hard")
+def run_shortq_hard(models, payload, ctx):
+    return _run_hard(models, payload, ctx, "sentences")
+
+
+@job_handler("mcq_hard")
+def run_mcq_hard(models, payload, ctx):
+    return _run_hard(models, payload, ctx, "multiple_choice")
+
+
+def worker_id(pid=None):
+    return f"{socket.gethostname()}:{pid or os.getpid()}"
+
+
+def run_job(queue, models, job):
+    ctx = JobContext(queue, job["id"])
+    try:
+        result = JOB_HANDLERS[job["kind"]](models, job["payload"], ctx)
+    except JobCancelled:
+        queue.finish(job["id"], CANCELLED, timings=ctx.timings)
+    except Exception as e:
+        print(f"Job {job['id']} ({job['kind']}) failed: {e}")
+        queue.finish(job["id"], FAILED, error=str(e), timings=ctx.timings)
+    else:
+        status = CANCELLED if queue.cancel_requested(job["id"]) else DONE
+        queue.finish(job["id"], status, result=result, timings=ctx.timings)
+
+
+def work(queue_path=DEFAULT_QUEUE_PATH, poll_interval=0.2):
+    """Worker process main loop: claims jobs one at a time and runs them. Start it through
+    worker.py, which configures the runtime before the Generator package is imported.
+    """
+    queue = JobQueue(queue_path)
+    models = worker_models()
+    worker = worker_id()
+    print(f"Job worker {worker} polling {queue_path}")
+    while True:
+        job = queue.claim(worker)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        run_job(queue, models, job)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class WorkerPool:
+    """Keeps a fixed number of worker processes running against a JobQueue.
+
+    Workers are separate interpreters (python worker.py), so each holds its own
+    copy of the models it uses. On start, jobs left running by workers of a previous
+    server on this host are queued again. A worker that dies while running a job fails
+    that job, since retrying it could crash the replacement the same way, and is restarted.
+    """
+
+    def __init__(self, queue, workers=1, poll_interval=0.2, check_interval=5.0):
+        self.queue = queue
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.check_interval = check_interval
+        self._processes = []
+        self._thread = None
+
+    def _spawn(self):
+        return subprocess.Popen(
+            [sys.executable, "worker.py", "--queue", os.path.abspath(self.queue.path),
+             "--poll_interval", str(self.poll_interval)],
+            cwd=BACKEND_DIR,
+        )
+
+    def start(self):
+        if self._thread is not None or self.workers <= 0:
+            return
+        host = socket.gethostname() + ":"
+        for worker in self.queue.running_workers():
+            if worker and worker.startswith(host) and not _pid_alive(int(worker[len(host):])):
+                self.queue.requeue(worker)
+        self._processes = [self._spawn() for _ in range(self.workers)]
+        self._thread = threading.Thread(target=self._monitor, daemon=True)
+        self._thread.start()
+
+    def _monitor(self):
+        while True:
+            time.sleep(self.check_interval)
+            for i, process in enumerate(self._processes):
+                if process.poll() is None:
+                    continue
+                print(f"Job worker {process.pid} exited with code {process.returncode}, restarting")
+                self.queue.fail_running(worker_id(process.pid), f"worker exited with code {process.returncode}")
+                self._processes[i] = self._spawn()
+
+    def stop(self):
+        for process in self._processes:
+            process.terminate()
+
+    def status(self):
+        return [{"pid": process.pid, "alive": process.poll() is None} for process in self._processes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a generation job worker")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="SQLite job queue to poll")
+    parser.add_argument("--poll_interval", type=float, default=0.2, help="Seconds to wait when the queue is empty")
+    args = parser.parse_args()
+    work(args.queue, args.poll_interval)
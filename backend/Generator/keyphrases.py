@@ -0,0 +1,201 @@
+import math
+import string
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from nltk.corpus import stopwords
+from nltk.stem.snowball import SnowballStemmer
+from scipy.cluster.hierarchy import fcluster, linkage
+from scipy.spatial.distance import pdist
+
+CANDIDATE_POS = frozenset({'PROPN', 'NOUN'})
+VALID_PUNCTUATION = '-'
+
+
+class ParsedSentence:
+    """spaCy parse and keyphrase candidates of one sentence. Each candidate is
+    (surface words, stems, token offset within the sentence).
+    """
+
+    __slots__ = ("doc", "candidates")
+
+    def __init__(self, doc, candidates):
+        self.doc = doc
+        self.candidates = candidates
+
+
+class KeyphraseExtractor:
+    """MultipartiteRank keyphrase extraction over sentences parsed once and cached.
+
+    Sentences are parsed and their candidates (longest runs of nouns and proper nouns,
+    filtered against a stoplist built once) selected the first time they are seen, then
+    cached by sentence hash. Resubmitting an edited document only parses the sentences
+    that changed. The per-request work is the ranking: candidates are clustered into
+    topics, linked across topics by the inverse token distance of their occurrences,
+    the first candidate of each topic is boosted, and the graph is ranked with PageRank,
+    as in pke's MultipartiteRank with threshold=0.75, method='average' and alpha=1.1.
+    """
+
+    def __init__(self, nlp_model, max_sentences=4096):
+        self.nlp = nlp_model
+        self.max_sentences = max_sentences
+        self.stoplist = frozenset(string.punctuation) | frozenset(stopwords.words('english'))
+        self.stemmer = SnowballStemmer('porter')
+        self._sentences = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sentence_key(sentence):
+        return hashlib.sha1(sentence.encode("utf-8")).hexdigest()
+
+    def parse(self, sentences):
+        """Returns a ParsedSentence per sentence, parsing only the ones not cached yet."""
+        keys = [self._sentence_key(sentence) for sentence in sentences]
+        with self._lock:
+            parsed = {key: self._sentences[key] for key in keys if key in self._sentences}
+            for key in parsed:
+                self._sentences.move_to_end(key)
+
+        missing = {key: sentence for key, sentence in zip(keys, sentences) if key not in parsed}
+        if missing:
+            for key, doc in zip(missing, self.nlp.pipe(missing.values())):
+                parsed[key] = ParsedSentence(doc, self._select_candidates(doc))
+            with self._lock:
+                for key in missing:
+                    self._sentences[key] = parsed[key]
+                while len(self._sentences) > self.max_sentences:
+                    self._sentences.popitem(last=False)
+
+        return [parsed[key] for key in keys]
+
+    def document(self, parsed):
+        """Joins the sentence parses into one Doc, as if the joined text had been parsed."""
+        from spacy.tokens import Doc
+
+        if not parsed:
+            return self.nlp("")
+        return Doc.from_docs([sentence.doc for sentence in parsed])
+
+    def _select_candidates(self, doc):
+        candidates = []
+        start = None
+        for i, token in enumerate(list(doc) + [None]):
+            if token is not None and token.pos_ in CANDIDATE_POS:
+                if start is None:
+                    start = i
+                continue
+            if start is not None:
+                words = [t.text for t in doc[start:i]]
+                if self._keep(words):
+                    stems = tuple(self.stemmer.stem(word.lower()) for word in words)
+                    candidates.append((tuple(words), stems, start))
+                start = None
+        return candidates
+
+    def _keep(self, words, minimum_length=3, minimum_word_size=2, maximum_word_number=5):
+        lowered = [word.lower() for word in words]
+        if self.stoplist.intersection(lowered):
+            return False
+        if len("".join(lowered)) < minimum_length or min(len(word) for word in lowered) < minimum_word_size:
+            return False
+        if len(lowered) > maximum_word_number:
+            return False
+        return all(word.replace(VALID_PUNCTUATION, "").isalnum() for word in lowered)
+
+    def extract(self, sentences, n=10):
+        return self.rank(self.parse(sentences), n)
+
+    def rank(self, parsed, n=10, threshold=0.75, alpha=1.1):
+        """Returns the n best keyphrases of the parsed sentences, lowercased."""
+        # candidates are keyed by their stems; the first surface form seen names them
+        index, surface_forms, stems, occurrences = {}, [], [], []
+        shift = 0
+        for sentence in parsed:
+            for words, candidate_stems, offset in sentence.candidates:
+                if candidate_stems not in index:
+                    index[candidate_stems] = len(stems)
+                    surface_forms.append(" ".join(words).lower())
+                    stems.append(candidate_stems)
+                occurrences.append((index[candidate_stems], shift + offset, len(candidate_stems)))
+            shift += len(sentence.doc)
+        if not stems:
+            return []
+
+        topics = self._topics(stems, threshold)
+        scores = _pagerank(self._graph(topics, occurrences, alpha))
+        order = sorted(range(len(stems)), key=lambda c: -scores[c])
+        return [surface_forms[c] for c in order[:n]]
+
+    @staticmethod
+    def _topics(stems, threshold):
+        if len(stems) == 1:
+            return np.zeros(1, dtype=np.int64)
+        vocabulary = {stem: i for i, stem in enumerate(sorted({s for candidate in stems for s in candidate}))}
+        X = np.zeros((len(stems), len(vocabulary)), dtype=bool)
+        for c, candidate in enumerate(stems):
+            X[c, [vocabulary[s] for s in candidate]] = True
+        distances = np.nan_to_num(pdist(X, 'jaccard'))
+        return fcluster(linkage(distances, method='average'), t=threshold, criterion='distance')
+
+    @staticmethod
+    def _graph(topics, occurrences, alpha):
+        """Weighted adjacency matrix of the multipartite candidate graph."""
+        candidate, offset, length = (np.array(column) for column in zip(*occurrences))
+        num_candidates = len(topics)
+
+        # gap between two occurrences, not counting the extra words of the earlier one
+        gap = np.abs(offset[:, None] - offset[None, :])
+        earlier_length = np.where(offset[:, None] < offset[None, :], length[:, None], length[None, :])
+        gap = gap - (earlier_length - 1)
+        linked = topics[candidate][:, None] != topics[candidate][None, :]
+        inverse = np.where(linked, 1.0 / np.maximum(gap, 1), 0.0)
+
+        weights = np.zeros((num_candidates, num_candidates))
+        np.add.at(weights, (candidate[:, None], candidate[None, :]), inverse)
+
+        # the first occurring candidate of each topic gets the weight its variants receive
+        first_offset = np.full(num_candidates, np.iinfo(np.int64).max)
+        np.minimum.at(first_offset, candidate, offset)
+        boosted = weights.copy()
+        for topic in np.unique(topics):
+            members = np.flatnonzero(topics == topic)
+            if len(members) < 2:
+                continue
+            first = members[np.argmin(first_offset[members])]
+            boosters = weights[members[members != first]].sum(axis=0)
+            position = math.exp(1.0 / (1 + first_offset[first]))
+            boosted[:, first] += boosters * alpha * position
+        return boosted
+
+
+def _pagerank(weights, damping=0.85, tol=1e-4, max_iter=100):
+    """PageRank of a weighted directed graph given as an adjacency matrix, with dangling
+    nodes spreading their rank uniformly like networkx.pagerank.
+    """
+    n = len(weights)
+    out_weight = weights.sum(axis=1)
+    dangling = out_weight == 0
+    transition = np.divide(weights, out_weight[:, None], out=np.zeros_like(weights), where=~dangling[:, None])
+    scores = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        previous = scores
+        scores = damping * (scores @ transition + scores[dangling].sum() / n) + (1 - damping) / n
+        if np.abs(scores - previous).sum() < n * tol:
+            break
+    return scores
+
+
+_extractors = {}
+_extractors_lock = threading.Lock()
+
+
+def get_keyphrase_extractor(nlp_model):
+    """Returns the KeyphraseExtractor shared by everything using nlp_model."""
+    with _extractors_lock:
+        extractor = _extractors.get(id(nlp_model))
+        if extractor is None or extractor.nlp is not nlp_model:
+            extractor = KeyphraseExtractor(nlp_model)
+            _extractors[id(nlp_model)] = extractor
+        return extractor
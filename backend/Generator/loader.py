@@ -0,0 +1,121 @@
+import time
+import threading
+
+
+class ModelNotReady(Exception):
+    def __init__(self, names):
+        super().__init__("Models still loading: " + ", ".join(names))
+        self.names = names
+
+
+class ModelLoadFailed(Exception):
+    def __init__(self, errors):
+        super().__init__("Models failed to load: " + ", ".join(f"{name} ({error})" for name, error in errors.items()))
+        self.errors = errors
+
+
+class ModelLoader:
+    """Builds the server's generators on demand or on a background warm-up thread.
+
+    Components are registered with a factory and a priority. start() loads them on a
+    daemon thread, lowest priority first, while the server is already listening.
+    ensure() is called before a route runs: in blocking mode it loads any missing
+    component right away (waiting if the warm-up thread is already on it), otherwise
+    it raises ModelNotReady so the route can answer 503. In non-blocking mode a component
+    whose load failed is not retried and ensure() raises ModelLoadFailed with the error;
+    in blocking mode every ensure() tries to load it again.
+    """
+
+    def __init__(self, block=False):
+        self.block = block
+        self._factories = {}
+        self._priorities = {}
+        self._instances = {}
+        self._errors = {}
+        self._load_times = {}
+        self._locks = {}
+        self._thread = None
+
+    def register(self, name, factory, priority=0):
+        self._factories[name] = factory
+        self._priorities[name] = priority
+        self._locks[name] = threading.Lock()
+
+    def proxy(self, name):
+        return _LazyProxy(self, name)
+
+    def order(self):
+        return sorted(self._factories, key=lambda name: self._priorities[name])
+
+    def load(self, name):
+        with self._locks[name]:
+            if name in self._instances:
+                return self._instances[name]
+            start_time = time.time()
+            try:
+                instance = self._factories[name]()
+            except Exception as e:
+                self._errors[name] = str(e)
+                raise
+            self._errors.pop(name, None)
+            self._load_times[name] = time.time() - start_time
+            self._instances[name] = instance
+            print(f"Model component '{name}' ready in {self._load_times[name]:.1f}s")
+            return instance
+
+    def load_all(self):
+        for name in self.order():
+            try:
+                self.load(name)
+            except Exception as e:
+                print(f"Failed to load model component '{name}': {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.load_all, daemon=True)
+            self._thread.start()
+
+    def is_ready(self, name):
+        return name in self._instances
+
+    def ensure(self, *names):
+        missing = [name for name in names if not self.is_ready(name)]
+        if not missing:
+            return
+        if not self.block:
+            failed = {name: self._errors[name] for name in missing if name in self._errors}
+            if failed:
+                raise ModelLoadFailed(failed)
+            raise ModelNotReady(missing)
+        for name in missing:
+            self.load(name)
+
+    def get(self, name):
+        if not self.is_ready(name):
+            self.ensure(name)
+        return self._instances[name]
+
+    def status(self):
+        return {
+            name: {
+                "ready": self.is_ready(name),
+                "priority": self._priorities[name],
+                "load_time": self._load_times.get(name),
+                "error": self._errors.get(name),
+            }
+            for name in self.order()
+        }
+
+
+class _LazyProxy:
+    """Forwards attribute access and calls to a component once the loader has built it."""
+
+    def __init__(self, loader, name):
+        self._loader = loader
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._loader.get(self._name), attr)
+
+    def __call__(self, *args, **kwargs):
+        return self._loader.get(self._name)(*args, **kwargs)
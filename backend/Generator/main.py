@@ -1,40 +1,40 @@
+import math
 import time
 import torch
 import random
-from transformers import T5ForConditionalGeneration, T5Tokenizer
-from transformers import AutoModelForSequenceClassification, AutoTokenizer,AutoModelForSeq2SeqLM, T5ForConditionalGeneration, T5Tokenizer
 import numpy as np
-import spacy
-from sense2vec import Sense2Vec
-from collections import OrderedDict
-from nltk import FreqDist
-from nltk.corpus import brown
 from similarity.normalized_levenshtein import NormalizedLevenshtein
-from Generator.mcq import tokenize_into_sentences, identify_keywords, find_sentences_with_keywords, generate_multiple_choice_questions, generate_normal_questions
-from Generator.encoding import beam_search_decoding
+from Generator.mcq import tokenize_into_sentences, generate_multiple_choice_questions, iter_multiple_choice_questions, generate_normal_questions, DocumentAnalysis, reuse_questions, merge_questions, filter_near_duplicates
+from Generator.encoding import bucketed_generate, iter_bucketed_generate, policy_for, request_policy
+from Generator.registry import ModelHandle, default_device, backend_for
+from Generator.scheduler import get_scheduler
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
-import en_core_web_sm
 import json
 import re
-from typing import Any, List, Mapping, Tuple
-import re
+from typing import Any, Iterator, List, Mapping, Tuple
 import os
+import uuid
 import fitz 
 import mammoth
 
 class MCQGenerator:
     
     def __init__(self):
-        self.tokenizer = T5Tokenizer.from_pretrained('t5-large')
-        self.model = T5ForConditionalGeneration.from_pretrained('Roasters/Question-Generator')
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model.to(self.device)
-        self.nlp = spacy.load('en_core_web_sm')
-        self.s2v = Sense2Vec().from_disk('s2v_old')
-        self.fdist = FreqDist(brown.words())
+        self.models = ModelHandle()
+        self.device = default_device()
+        self.tokenizer = self.models.t5_tokenizer('t5-large')
+        self.model = self.models.t5_model('Roasters/Question-Generator', self.device, backend=backend_for('mcq'))
+        self.nlp = self.models.spacy('en_core_web_sm')
+        self.s2v = self.models.sense2vec()
+        self.fdist = self.models.brown_fdist()
+        self.batcher = get_scheduler(self.model)
         self.normalized_levenshtein = NormalizedLevenshtein()
+        self.decoding = policy_for('mcq')
         self.set_seed(42)
+
+    def close(self):
+        self.models.release()
         
     def set_seed(self, seed):
         np.random.seed(seed)
@@ -42,38 +42,42 @@ class MCQGenerator:
         if torch.cuda.is_available():
             torch.cuda.manual_seed_all(seed)
             
-    def generate_mcq(self, payload):
+    def analyze(self, text):
+        return DocumentAnalysis(text, self.nlp)
+
+    def generate_mcq(self, payload, analysis=None, previous=None):
+        """Generates MCQs for payload. previous indexes the questions of an earlier version of
+        the same document (see index_questions); questions whose answer and source sentences
+        are unchanged are taken from it instead of being generated again.
+        """
         start_time = time.time()
         inp = {
             "input_text": payload.get("input_text"),
             "max_questions": payload.get("max_questions", 4)
         }
 
-        text = inp['input_text']
-        sentences = tokenize_into_sentences(text)
-        modified_text = " ".join(sentences)
-
-        keywords = identify_keywords(self.nlp, modified_text, inp['max_questions'], self.s2v, self.fdist, self.normalized_levenshtein, len(sentences))
-        keyword_sentence_mapping = find_sentences_with_keywords(keywords, sentences)
-
-        for k in keyword_sentence_mapping.keys():
-            text_snippet = " ".join(keyword_sentence_mapping[k][:3])
-            keyword_sentence_mapping[k] = text_snippet
+        policy = request_policy(self.decoding, payload)
+        if analysis is None:
+            analysis = self.analyze(inp['input_text'])
+        modified_text = analysis.modified_text
+        keyword_sentence_mapping = analysis.keyword_sentence_mapping(inp['max_questions'], self.s2v, self.fdist, self.normalized_levenshtein)
 
         final_output = {}
 
         if len(keyword_sentence_mapping.keys()) == 0:
             return final_output
         else:
+            reused, changed_mapping = reuse_questions(keyword_sentence_mapping, previous or {})
             try:
-                generated_questions = generate_multiple_choice_questions(keyword_sentence_mapping, self.device, self.tokenizer, self.model, self.s2v, self.normalized_levenshtein)
+                generated_questions = generate_multiple_choice_questions(changed_mapping, self.device, self.tokenizer, self.batcher, self.s2v, self.normalized_levenshtein, policy) if changed_mapping else {"questions": []}
             except:
                 return final_output
 
             end_time = time.time()
 
             final_output["statement"] = modified_text
-            final_output["questions"] = generated_questions["questions"]
+            final_output["questions"] = merge_questions(keyword_sentence_mapping, reused, generated_questions["questions"], "answer")
+            final_output["reused"] = len(reused)
             final_output["time_taken"] = end_time - start_time
             
             if torch.device == 'cuda':
@@ -81,18 +85,39 @@ class MCQGenerator:
                 
             return final_output
 
+    def generate_mcq_stream(self, payload, bucket_size=4, analysis=None):
+        """Yields each MCQ question as soon as it is decoded and its options are found. Small
+        buckets keep the time to the first question low.
+        """
+        inp = {
+            "input_text": payload.get("input_text"),
+            "max_questions": payload.get("max_questions", 4)
+        }
+
+        policy = request_policy(self.decoding, payload)
+        if analysis is None:
+            analysis = self.analyze(inp['input_text'])
+        keyword_sentence_mapping = analysis.keyword_sentence_mapping(inp['max_questions'], self.s2v, self.fdist, self.normalized_levenshtein)
+
+        yield from iter_multiple_choice_questions(keyword_sentence_mapping, self.device, self.tokenizer, self.batcher, self.s2v, self.normalized_levenshtein, bucket_size, policy)
+
 class ShortQGenerator:
     
     def __init__(self):
-        self.tokenizer = T5Tokenizer.from_pretrained('t5-large')
-        self.model = T5ForConditionalGeneration.from_pretrained('Roasters/Question-Generator')
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model.to(self.device)
-        self.nlp = spacy.load('en_core_web_sm')
-        self.s2v = Sense2Vec().from_disk('s2v_old')
-        self.fdist = FreqDist(brown.words())
+        self.models = ModelHandle()
+        self.device = default_device()
+        self.tokenizer = self.models.t5_tokenizer('t5-large')
+        self.model = self.models.t5_model('Roasters/Question-Generator', self.device, backend=backend_for('shortq'))
+        self.nlp = self.models.spacy('en_core_web_sm')
+        self.s2v = self.models.sense2vec()
+        self.fdist = self.models.brown_fdist()
+        self.batcher = get_scheduler(self.model)
         self.normalized_levenshtein = NormalizedLevenshtein()
+        self.decoding = policy_for('shortq')
         self.set_seed(42)
+
+    def close(self):
+        self.models.release()
         
     def set_seed(self, seed):
         np.random.seed(seed)
@@ -100,32 +125,35 @@ class ShortQGenerator:
         if torch.cuda.is_available():
             torch.cuda.manual_seed_all(seed)
             
-    def generate_shortq(self, payload):
+    def analyze(self, text):
+        return DocumentAnalysis(text, self.nlp)
+
+    def generate_shortq(self, payload, analysis=None, previous=None):
+        """Generates short-answer questions for payload, reusing unchanged questions from
+        previous like MCQGenerator.generate_mcq.
+        """
         inp = {
             "input_text": payload.get("input_text"),
             "max_questions": payload.get("max_questions", 4)
         }
 
-        text = inp['input_text']
-        sentences = tokenize_into_sentences(text)
-        modified_text = " ".join(sentences)
-
-        keywords = identify_keywords(self.nlp, modified_text, inp['max_questions'], self.s2v, self.fdist, self.normalized_levenshtein, len(sentences))
-        keyword_sentence_mapping = find_sentences_with_keywords(keywords, sentences)
-        
-        for k in keyword_sentence_mapping.keys():
-            text_snippet = " ".join(keyword_sentence_mapping[k][:3])
-            keyword_sentence_mapping[k] = text_snippet
+        policy = request_policy(self.decoding, payload)
+        if analysis is None:
+            analysis = self.analyze(inp['input_text'])
+        modified_text = analysis.modified_text
+        keyword_sentence_mapping = analysis.keyword_sentence_mapping(inp['max_questions'], self.s2v, self.fdist, self.normalized_levenshtein)
 
         final_output = {}
 
         if len(keyword_sentence_mapping.keys()) == 0:
             return final_output
         else:
-            generated_questions = generate_normal_questions(keyword_sentence_mapping, self.device, self.tokenizer, self.model)
+            reused, changed_mapping = reuse_questions(keyword_sentence_mapping, previous or {})
+            generated_questions = generate_normal_questions(changed_mapping, self.device, self.tokenizer, self.batcher, policy) if changed_mapping else {"questions": []}
 
         final_output["statement"] = modified_text
-        final_output["questions"] = generated_questions["questions"]
+        final_output["questions"] = merge_questions(keyword_sentence_mapping, reused, generated_questions["questions"], "Answer")
+        final_output["reused"] = len(reused)
         
         if torch.device == 'cuda':
             torch.cuda.empty_cache()
@@ -135,11 +163,15 @@ class ShortQGenerator:
 class ParaphraseGenerator:
     
     def __init__(self):
-        self.tokenizer = T5Tokenizer.from_pretrained('t5-large')
-        self.model = T5ForConditionalGeneration.from_pretrained('Roasters/Question-Generator')
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model.to(self.device)
+        self.models = ModelHandle()
+        self.device = default_device()
+        self.tokenizer = self.models.t5_tokenizer('t5-large')
+        self.model = self.models.t5_model('Roasters/Question-Generator', self.device, backend=backend_for('paraphrase'))
+        self.decoding = policy_for('paraphrase')
         self.set_seed(42)
+
+    def close(self):
+        self.models.release()
         
     def set_seed(self, seed):
         np.random.seed(seed)
@@ -163,14 +195,12 @@ class ParaphraseGenerator:
         encoding = self.tokenizer.encode_plus(text_to_paraphrase, pad_to_max_length=True, return_tensors="pt")
         input_ids, attention_masks = encoding["input_ids"].to(self.device), encoding["attention_mask"].to(self.device)
 
+        policy = request_policy(self.decoding, payload)
         beam_outputs = self.model.generate(
             input_ids=input_ids,
             attention_mask=attention_masks,
-            max_length=50,
-            num_beams=50,
             num_return_sequences=num,
-            no_repeat_ngram_size=2,
-            early_stopping=True
+            **policy.generate_kwargs(int(attention_masks.sum()))
             )
 
         final_outputs =[]
@@ -190,13 +220,53 @@ class ParaphraseGenerator:
         return output
 
 class BoolQGenerator:
-       
-    def __init__(self):
-        self.tokenizer = T5Tokenizer.from_pretrained('t5-base')
-        self.model = T5ForConditionalGeneration.from_pretrained('Roasters/Boolean-Questions')
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model.to(self.device)
+    """Generates boolean questions in one of two modes.
+
+    "anchored" (the default, EDUAID_BOOLQ_MODE) picks about 1.5 * max_questions sentences
+    spread over the document. Each becomes a short prompt with its neighbouring sentences, up
+    to anchor_tokens tokens, and the prompts alternate between asking for true and false
+    statements. Duplicate prompts are dropped and the rest are decoded together in one batched
+    generate call with a narrow beam, so more questions means more rows in the batch instead of
+    a wider beam. Only when a short document yields too few distinct prompts is the beam
+    widened, up to MAX_PER_WINDOW, to still reach max_questions.
+
+    "windows" is a map-reduce over the whole document. Sentences are packed into windows of
+    at most window_tokens tokens, each window becomes one prompt, and windows are decoded in
+    length-bucketed batches of at most batch_size prompts and max_batch_tokens padded tokens.
+    Documents with more than max_windows windows use max_windows windows spread evenly over
+    the text.
+
+    In both modes candidates are merged round-robin by beam rank in document order and
+    near-duplicates are dropped. Prompt length, batch shape and beam width are bounded, so
+    peak memory does not grow with the document.
+    """
+
+    MODES = ("anchored", "windows")
+    # candidates generated per requested question, as slack for deduplication
+    OVERGENERATE = 1.5
+    MAX_PER_WINDOW = 10
+    DUPLICATE_SIMILARITY = 0.6
+
+    def __init__(self, window_tokens=384, batch_size=8, max_batch_tokens=4096, max_windows=16, anchor_tokens=128, mode=None):
+        self.models = ModelHandle()
+        self.device = default_device()
+        self.tokenizer = self.models.t5_tokenizer('t5-base')
+        self.model = self.models.t5_model('Roasters/Boolean-Questions', self.device, backend=backend_for('boolq'))
+        self.batcher = get_scheduler(self.model)
+        self.decoding = policy_for('boolq')
+        self.anchored_decoding = policy_for('boolq_anchored')
+        self.window_tokens = window_tokens
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_windows = max_windows
+        self.anchor_tokens = anchor_tokens
+        self.mode = mode or os.environ.get("EDUAID_BOOLQ_MODE", "anchored")
+        if self.mode not in self.MODES:
+            raise ValueError(f"Invalid BoolQ mode {self.mode}. Please choose from {self.MODES}")
         self.set_seed(42)
+
+    def close(self):
+        self.models.release()
         
     def set_seed(self, seed):
         np.random.seed(seed)
@@ -209,7 +279,94 @@ class BoolQGenerator:
         return bool(a)
     
 
-    def generate_boolq(self, payload):
+    def split_windows(self, sentences):
+        """Packs consecutive sentences into passages of at most window_tokens tokens. A sentence
+        longer than that becomes a window of its own and is truncated when encoded.
+        """
+        if not sentences:
+            return []
+        lengths = [len(ids) for ids in self.tokenizer(sentences, add_special_tokens=False)["input_ids"]]
+        windows, current, current_length = [], [], 0
+        for sentence, length in zip(sentences, lengths):
+            if current and current_length + length > self.window_tokens:
+                windows.append(" ".join(current))
+                current, current_length = [], 0
+            current.append(sentence)
+            current_length += length
+        windows.append(" ".join(current))
+
+        if len(windows) > self.max_windows:
+            keep = np.linspace(0, len(windows) - 1, self.max_windows).round().astype(int)
+            windows = [windows[i] for i in sorted(set(keep))]
+        return windows
+
+    def anchor_passages(self, sentences, num):
+        """Picks up to OVERGENERATE * num anchor sentences spread over the document and grows each
+        into a passage centred on it, adding following and preceding sentences in turn up to
+        anchor_tokens tokens.
+        """
+        if not sentences or num < 1:
+            return []
+        lengths = [len(ids) for ids in self.tokenizer(sentences, add_special_tokens=False)["input_ids"]]
+        count = min(len(sentences), math.ceil(num * self.OVERGENERATE))
+        anchors = sorted(set(np.linspace(0, len(sentences) - 1, count).round().astype(int)))
+
+        passages = []
+        for anchor in anchors:
+            start, end, length = anchor, anchor + 1, lengths[anchor]
+            forward = True
+            while True:
+                can_extend = end < len(sentences) and length + lengths[end] <= self.anchor_tokens
+                can_prepend = start > 0 and length + lengths[start - 1] <= self.anchor_tokens
+                if can_extend and (forward or not can_prepend):
+                    length += lengths[end]
+                    end += 1
+                elif can_prepend:
+                    start -= 1
+                    length += lengths[start]
+                else:
+                    break
+                forward = not forward
+            passages.append(" ".join(sentences[start:end]))
+        return passages
+
+    def merge_candidates(self, per_prompt, num):
+        """Interleaves the prompts' candidates by beam rank and keeps num of them, dropping exact
+        and near-duplicate questions first and only falling back to near-duplicates if needed.
+        """
+        candidates, seen = [], set()
+        for rank in range(max((len(questions) for questions in per_prompt), default=0)):
+            for questions in per_prompt:
+                if rank < len(questions):
+                    normalized = re.sub(r"\W+", " ", questions[rank].lower()).strip()
+                    if normalized and normalized not in seen:
+                        seen.add(normalized)
+                        candidates.append(questions[rank])
+
+        distinct = filter_near_duplicates(candidates, num, threshold=self.DUPLICATE_SIMILARITY)
+        if len(distinct) < num:
+            kept = set(distinct)
+            distinct += [question for question in candidates if question not in kept][:num - len(distinct)]
+        distinct = set(distinct)
+        return [question for question in candidates if question in distinct]
+
+    def generate_candidates(self, forms, policy, per_prompt, bucket_size):
+        per_prompt_questions = [[] for _ in forms]
+        if not forms:
+            return per_prompt_questions
+        for index, outs in iter_bucketed_generate(
+            forms, self.tokenizer, self.batcher, self.device, bucket_size, max_tokens=self.max_batch_tokens,
+            policy=policy, num_return_sequences=per_prompt,
+        ):
+            if per_prompt == 1:
+                outs = [outs]
+            per_prompt_questions[index] = [
+                self.tokenizer.decode(out, skip_special_tokens=True, clean_up_tokenization_spaces=True).strip().capitalize()
+                for out in outs
+            ]
+        return per_prompt_questions
+
+    def generate_boolq(self, payload, analysis=None):
         start_time = time.time()
         inp = {
             "input_text": payload.get("input_text"),
@@ -218,15 +375,37 @@ class BoolQGenerator:
 
         text = inp['input_text']
         num= inp['max_questions']
-        sentences = tokenize_into_sentences(text)
-        modified_text = " ".join(sentences)
-        answer = self.random_choice()
-        form = "truefalse: %s passage: %s </s>" % (modified_text, answer)
-        print(form)
-        encoding = self.tokenizer.encode_plus(form, return_tensors="pt")
-        input_ids, attention_masks = encoding["input_ids"].to(self.device), encoding["attention_mask"].to(self.device)
+        mode = payload.get("mode") or self.mode
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid BoolQ mode {mode}. Please choose from {self.MODES}")
+        if analysis is not None:
+            sentences = analysis.sentences
+        else:
+            sentences = tokenize_into_sentences(text)
 
-        output = beam_search_decoding (input_ids, attention_masks, self.model, self.tokenizer,num)
+        answer = self.random_choice()
+        if mode == "anchored":
+            passages = self.anchor_passages(sentences, num)
+            # alternate the requested answer so the quiz mixes true and false statements
+            answers = [answer if i % 2 == 0 else not answer for i in range(len(passages))]
+            policy = request_policy(self.anchored_decoding, payload)
+            bucket_size = max(len(passages), 1)
+        else:
+            passages = self.split_windows(sentences)
+            answers = [answer] * len(passages)
+            policy = request_policy(self.decoding, payload)
+            bucket_size = self.batch_size
+        # anchors close together can grow into the same passage; decode each prompt once
+        forms = list(dict.fromkeys(
+            "truefalse: %s passage: %s </s>" % (passage, passage_answer) for passage, passage_answer in zip(passages, answers)
+        ))
+
+        needed = math.ceil(num * self.OVERGENERATE / max(len(forms), 1))
+        if mode == "anchored" and policy.strategy == "beam" and policy.num_beams < needed:
+            # too few distinct prompts for a short document, so widen the beam to make up for it
+            policy = policy.replace(num_beams=min(needed, self.MAX_PER_WINDOW))
+        per_prompt = max(1, min(needed, policy.max_return_sequences() or self.MAX_PER_WINDOW))
+        output = self.merge_candidates(self.generate_candidates(forms, policy, per_prompt, bucket_size), num)
         if torch.device == 'cuda':
             torch.cuda.empty_cache()
         
@@ -240,18 +419,25 @@ class BoolQGenerator:
 
 class AnswerPredictor:
           
-    def __init__(self):
-        self.tokenizer = T5Tokenizer.from_pretrained('t5-large', model_max_length=512)
-        self.model = T5ForConditionalGeneration.from_pretrained('Roasters/Answer-Predictor')
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model.to(self.device)
+    def __init__(self, nli_batch_size=32, nli_stride=128):
+        self.models = ModelHandle()
+        self.device = default_device()
+        # t5-large already defaults to model_max_length=512, so this shares the generators' tokenizer
+        self.tokenizer = self.models.t5_tokenizer('t5-large')
+        self.model = self.models.t5_model('Roasters/Answer-Predictor', self.device, backend=backend_for('answer'))
         
         # Load the lightweight NLI model for boolean question answering
         self.nli_model_name = "typeform/distilbert-base-uncased-mnli"
-        self.nli_tokenizer = AutoTokenizer.from_pretrained(self.nli_model_name)
-        self.nli_model = AutoModelForSequenceClassification.from_pretrained(self.nli_model_name)
+        self.nli_tokenizer = self.models.auto_tokenizer(self.nli_model_name)
+        self.nli_model = self.models.sequence_classifier(self.nli_model_name, self.device)
+        self.nli_batch_size = nli_batch_size
+        self.nli_max_length = min(self.nli_tokenizer.model_max_length, 512)
+        self.nli_stride = nli_stride
         
         self.set_seed(42)
+
+    def close(self):
+        self.models.release()
         
     def set_seed(self, seed):
         np.random.seed(seed)
@@ -285,26 +471,156 @@ class AnswerPredictor:
         return answers
 
     def predict_boolean_answer(self, payload):
+        """Answers each question with whether the passage entails it.
+
+        All (passage, question) pairs are scored by the NLI model together. Passages longer
+        than the model's window are split into windows overlapping by nli_stride tokens, and a
+        question is true when its strongest entailment over the windows beats its strongest
+        contradiction.
+        """
         input_text = payload.get("input_text", "")
         input_questions = payload.get("input_question", [])
+        if isinstance(input_questions, str):
+            input_questions = [input_questions]
+        if not input_questions:
+            return []
+
+        inputs = self.nli_tokenizer(
+            [input_text] * len(input_questions),
+            list(input_questions),
+            truncation="only_first",
+            max_length=self.nli_max_length,
+            stride=self.nli_stride,
+            return_overflowing_tokens=True,
+            padding=True,
+            return_tensors="pt",
+        )
+        window_questions = inputs.pop("overflow_to_sample_mapping")
+
+        probabilities = []
+        with torch.no_grad():
+            for start in range(0, len(window_questions), self.nli_batch_size):
+                batch = {k: v[start:start + self.nli_batch_size].to(self.device) for k, v in inputs.items()}
+                logits = self.nli_model(**batch).logits
+                probabilities.append(torch.softmax(logits.float(), dim=1).cpu())
+        probabilities = torch.cat(probabilities)
+
+        # label 0 is entailment and 2 is contradiction for this checkpoint
+        entailment = torch.zeros(len(input_questions)).scatter_reduce(0, window_questions, probabilities[:, 0], reduce="amax")
+        contradiction = torch.zeros(len(input_questions)).scatter_reduce(0, window_questions, probabilities[:, 2], reduce="amax")
+        return (entailment > contradiction).tolist()
+
+class ExtractiveQA:
+    """Answers many questions about one context with an extractive QA checkpoint.
+
+    The context is tokenized once and cut into windows that overlap by doc_stride tokens.
+    Every question is paired with every window, and the pairs run through the model in
+    batches of batch_size. Each answer is the highest scoring span (start probability times
+    end probability, at most max_answer_len tokens) over all of the question's windows, which
+    is the score the question-answering pipeline reports.
+    """
 
-        answers = []
-
-        for question in input_questions:
-            hypothesis = question
-            inputs = self.nli_tokenizer.encode_plus(input_text, hypothesis, return_tensors="pt")
-            outputs = self.nli_model(**inputs)
-            logits = outputs.logits
-            probabilities = torch.softmax(logits, dim=1)
-            entailment_prob = probabilities[0][0].item()
-            contradiction_prob = probabilities[0][2].item()
-            
-            if entailment_prob > contradiction_prob:
-                answers.append(True)
-            else:
-                answers.append(False)
-
-        return answers
+    def __init__(self, model_name="distilbert/distilbert-base-cased-distilled-squad", batch_size=32,
+                 max_length=384, doc_stride=128, max_question_len=64, max_answer_len=15):
+        self.models = ModelHandle()
+        self.device = default_device()
+        self.model_name = model_name
+        self.tokenizer = self.models.auto_tokenizer(model_name)
+        self.model = self.models.question_answering(model_name, self.device)
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.doc_stride = doc_stride
+        self.max_question_len = max_question_len
+        self.max_answer_len = max_answer_len
+
+    def close(self):
+        self.models.release()
+
+    def _windows(self, num_tokens, window_len):
+        stride = min(self.doc_stride, window_len - 1)
+        windows = []
+        start = 0
+        while True:
+            end = min(start + window_len, num_tokens)
+            windows.append((start, end))
+            if end >= num_tokens:
+                return windows
+            start += window_len - stride
+
+    def _encode_pair(self, question_ids, window_ids):
+        input_ids = self.tokenizer.build_inputs_with_special_tokens(question_ids, window_ids)
+        # locate the window inside the special-token layout with a placeholder id
+        context_start = self.tokenizer.build_inputs_with_special_tokens(question_ids, [-1]).index(-1)
+        return input_ids, context_start
+
+    def answer(self, context, questions):
+        """Returns one {"answer", "score", "start", "end"} dict per question, with start and
+        end as character offsets into context.
+        """
+        if not questions:
+            return []
+        empty = {"answer": "", "score": 0.0, "start": 0, "end": 0}
+        if not context.strip():
+            return [dict(empty) for _ in questions]
+
+        context_encoding = self.tokenizer(context, add_special_tokens=False, return_offsets_mapping=True)
+        context_ids = context_encoding["input_ids"]
+        offsets = context_encoding["offset_mapping"]
+        question_ids = self.tokenizer(
+            list(questions), add_special_tokens=False, truncation=True, max_length=self.max_question_len
+        )["input_ids"]
+
+        # one window layout shared by every question, sized for the longest one
+        window_len = self.max_length - max(len(ids) for ids in question_ids) - self.tokenizer.num_special_tokens_to_add(pair=True)
+        windows = self._windows(len(context_ids), window_len)
+
+        pairs = []
+        for q, ids in enumerate(question_ids):
+            for start, end in windows:
+                input_ids, context_start = self._encode_pair(ids, context_ids[start:end])
+                pairs.append((q, start, context_start, end - start, input_ids))
+
+        best = [dict(empty) for _ in questions]
+        for batch_start in range(0, len(pairs), self.batch_size):
+            batch = pairs[batch_start:batch_start + self.batch_size]
+            for (q, start, context_start, length, _), (score, s, e) in zip(batch, self._best_spans(batch)):
+                if score > best[q]["score"]:
+                    s, e = s - context_start + start, e - context_start + start
+                    best[q] = {
+                        "answer": context[offsets[s][0]:offsets[e][1]],
+                        "score": score,
+                        "start": offsets[s][0],
+                        "end": offsets[e][1],
+                    }
+        return best
+
+    def _best_spans(self, batch):
+        """Returns (score, start token, end token) of the best context span of each pair."""
+        longest = max(len(pair[4]) for pair in batch)
+        input_ids = torch.full((len(batch), longest), self.tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(batch), longest), dtype=torch.long)
+        context_mask = torch.zeros((len(batch), longest), dtype=torch.bool)
+        for i, (_, _, context_start, length, ids) in enumerate(batch):
+            input_ids[i, :len(ids)] = torch.tensor(ids)
+            attention_mask[i, :len(ids)] = 1
+            context_mask[i, context_start:context_start + length] = True
+
+        with torch.no_grad():
+            outputs = self.model(input_ids=input_ids.to(self.device), attention_mask=attention_mask.to(self.device))
+        start_logits = outputs.start_logits.float().cpu().masked_fill(~context_mask, -1e4)
+        end_logits = outputs.end_logits.float().cpu().masked_fill(~context_mask, -1e4)
+        start_probs = torch.softmax(start_logits, dim=1)
+        end_probs = torch.softmax(end_logits, dim=1)
+
+        # candidate spans end at or after their start and are at most max_answer_len tokens long
+        scores = start_probs[:, :, None] * end_probs[:, None, :]
+        scores = torch.triu(scores) - torch.triu(scores, diagonal=self.max_answer_len)
+        flat = scores.view(len(batch), -1).argmax(dim=1)
+        starts, ends = flat // longest, flat % longest
+        return [
+            (scores[i, starts[i], ends[i]].item(), starts[i].item(), ends[i].item())
+            for i in range(len(batch))
+        ]
 
 class GoogleDocsService:
     def __init__(self, service_account_file, scopes):
@@ -361,22 +677,35 @@ class FileProcessor:
             result = mammoth.extract_raw_text(docx_file)
             return result.value
 
-    def process_file(self, file):
-        file_path = os.path.join(self.upload_folder, file.filename)
+    def save_upload(self, file):
+        """Saves an uploaded file under a unique name, keeping its extension, and returns the path."""
+        file_path = os.path.join(self.upload_folder, uuid.uuid4().hex + "_" + os.path.basename(file.filename))
         file.save(file_path)
-        content = ""
+        return file_path
+
+    def is_upload(self, file_path):
+        """Whether file_path is inside the upload folder, after resolving symlinks and ".."."""
+        folder = os.path.realpath(self.upload_folder)
+        return os.path.commonpath([folder, os.path.realpath(file_path)]) == folder
 
-        if file.filename.endswith('.txt'):
+    def extract_text(self, file_path):
+        content = ""
+        if file_path.endswith('.txt'):
             with open(file_path, 'r') as f:
                 content = f.read()
-        elif file.filename.endswith('.pdf'):
+        elif file_path.endswith('.pdf'):
             content = self.extract_text_from_pdf(file_path)
-        elif file.filename.endswith('.docx'):
+        elif file_path.endswith('.docx'):
             content = self.extract_text_from_docx(file_path)
-
-        os.remove(file_path)
         return content
 
+    def process_file(self, file):
+        file_path = self.save_upload(file)
+        try:
+            return self.extract_text(file_path)
+        finally:
+            os.remove(file_path)
+
 class QuestionGenerator:
     """A transformer-based NLP system for generating reading comprehension-style questions from
     texts. It can generate full sentence questions, multiple choice questions, or a mix of the
@@ -387,22 +716,30 @@ class QuestionGenerator:
     by setting use_evaluator=False.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, batch_size: int = 16, max_batch_tokens: int = 8192) -> None:
 
         QG_PRETRAINED = "iarfmoose/t5-base-question-generator"
         self.ANSWER_TOKEN = "<answer>"
         self.CONTEXT_TOKEN = "<context>"
         self.SEQ_LENGTH = 512
 
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        # Generation batches hold at most batch_size inputs and max_batch_tokens padded tokens
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+
+        self.device = default_device()
+        self.models = ModelHandle()
 
-        self.qg_tokenizer = AutoTokenizer.from_pretrained(QG_PRETRAINED, use_fast=False)
-        self.qg_model = AutoModelForSeq2SeqLM.from_pretrained(QG_PRETRAINED)
-        self.qg_model.to(self.device)
-        self.qg_model.eval()
+        self.qg_tokenizer = self.models.auto_tokenizer(QG_PRETRAINED, use_fast=False)
+        self.qg_model = self.models.seq2seq_model(QG_PRETRAINED, self.device, backend=backend_for('qg'))
+        self.nlp = self.models.spacy('en_core_web_sm')
 
         self.qa_evaluator = QAEvaluator()
 
+    def close(self) -> None:
+        self.models.release()
+        self.qa_evaluator.close()
+
     def generate(
         self,
         article: str,
@@ -430,7 +767,7 @@ class QuestionGenerator:
             encoded_qa_pairs = self.qa_evaluator.encode_qa_pairs(
                 generated_questions, qg_answers
             )
-            scores = self.qa_evaluator.get_scores(encoded_qa_pairs)
+            scores = self.qa_evaluator.get_scores(encoded_qa_pairs, num_questions)
 
             if num_questions:
                 qa_list = self._get_ranked_qa_pairs(
@@ -447,6 +784,28 @@ class QuestionGenerator:
 
         return qa_list
 
+    def generate_stream(
+        self, article: str, answer_style: str = "all", bucket_size: int = 4
+    ) -> Iterator[Mapping[str, Any]]:
+        """Like generate with use_evaluator=False, but yields each QA pair as soon as its bucket
+        has been decoded. Pairs arrive in bucket order and carry their 1-based position in "id".
+        """
+        qg_inputs, qg_answers = self.generate_qg_inputs(article, answer_style)
+
+        for index, output in iter_bucketed_generate(
+            qg_inputs,
+            self.qg_tokenizer,
+            self.qg_model,
+            self.device,
+            bucket_size=bucket_size,
+            max_input_length=self.SEQ_LENGTH,
+            max_tokens=self.max_batch_tokens,
+        ):
+            question = self.qg_tokenizer.decode(output, skip_special_tokens=True)
+            qa = self._get_all_qa_pairs([question], [qg_answers[index]])[0]
+            qa["id"] = index + 1
+            yield qa
+
     def generate_qg_inputs(
         self, text: str, answer_style: str
     ) -> Tuple[List[str], List[str]]:
@@ -490,15 +849,23 @@ class QuestionGenerator:
     def generate_questions_from_inputs(self, qg_inputs: List) -> List[str]:
         """Given a list of concatenated answers and contexts, with the form:
         "answer_token <answer text> context_token <context text>", generates a list of
-        questions.
+        questions. Inputs are decoded in length-bucketed batches and the questions are
+        returned in the same order as qg_inputs.
         """
-        generated_questions = []
-
-        for qg_input in qg_inputs:
-            question = self._generate_question(qg_input)
-            generated_questions.append(question)
+        if not qg_inputs:
+            return []
+
+        outputs = bucketed_generate(
+            qg_inputs,
+            self.qg_tokenizer,
+            self.qg_model,
+            self.device,
+            bucket_size=self.batch_size,
+            max_input_length=self.SEQ_LENGTH,
+            max_tokens=self.max_batch_tokens,
+        )
 
-        return generated_questions
+        return [self.qg_tokenizer.decode(output, skip_special_tokens=True) for output in outputs]
 
     def _split_text(self, text: str) -> List[str]:
         """Splits the text into sentences, and attempts to split or truncate long sentences."""
@@ -560,8 +927,7 @@ class QuestionGenerator:
         questions. Sentences are used as context, and entities as answers. Returns a tuple of (model inputs, answers).
         Model inputs are "answer_token <answer text> context_token <context text>"
         """
-        spacy_nlp = en_core_web_sm.load()
-        docs = list(spacy_nlp.pipe(sentences, disable=["parser"]))
+        docs = list(self.nlp.pipe(sentences, disable=["parser"]))
         inputs_from_text = []
         answers_from_text = []
 
@@ -624,28 +990,6 @@ class QuestionGenerator:
         random.shuffle(final_choices)
         return final_choices
 
-    @torch.no_grad()
-    def _generate_question(self, qg_input: str) -> str:
-        """Takes qg_input which is the concatenated answer and context, and uses it to generate
-        a question sentence. The generated question is decoded and then returned.
-        """
-        encoded_input = self._encode_qg_input(qg_input)
-        output = self.qg_model.generate(input_ids=encoded_input["input_ids"])
-        question = self.qg_tokenizer.decode(output[0], skip_special_tokens=True)
-        return question
-
-    def _encode_qg_input(self, qg_input: str) -> torch.tensor:
-        """Tokenizes a string and returns a tensor of input ids corresponding to indices of tokens in
-        the vocab.
-        """
-        return self.qg_tokenizer(
-            qg_input,
-            padding="max_length",
-            max_length=self.SEQ_LENGTH,
-            truncation=True,
-            return_tensors="pt",
-        ).to(self.device)
-
     def _get_ranked_qa_pairs(
         self,
         generated_questions: List[str],
@@ -692,47 +1036,62 @@ class QAEvaluator:
     QA pairs.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, batch_size: int = 32) -> None:
 
         QAE_PRETRAINED = "iarfmoose/bert-base-cased-qa-evaluator"
         self.SEQ_LENGTH = 512
+        # QA pairs are encoded and scored in chunks of batch_size to keep memory bounded
+        self.batch_size = batch_size
 
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.device = default_device()
+        self.models = ModelHandle()
 
-        self.qae_tokenizer = AutoTokenizer.from_pretrained(QAE_PRETRAINED)
-        self.qae_model = AutoModelForSequenceClassification.from_pretrained(
-            QAE_PRETRAINED
-        )
-        self.qae_model.to(self.device)
-        self.qae_model.eval()
+        self.qae_tokenizer = self.models.auto_tokenizer(QAE_PRETRAINED)
+        self.qae_model = self.models.sequence_classifier(QAE_PRETRAINED, self.device)
+
+    def close(self) -> None:
+        self.models.release()
 
     def encode_qa_pairs(
         self, questions: List[str], answers: List[str]
     ) -> List[torch.tensor]:
-        """Takes a list of questions and a list of answers and encodes them as a list of tensors."""
-        encoded_pairs = []
+        """Takes a list of questions and a list of answers and encodes them as a list of
+        batches, each padded to its own longest pair.
+        """
+        encoded_batches = []
+        correct_answers = [self._get_correct_answer(answer) for answer in answers]
+
+        for start in range(0, len(questions), self.batch_size):
+            encoded_batch = self.qae_tokenizer(
+                text=questions[start:start + self.batch_size],
+                text_pair=correct_answers[start:start + self.batch_size],
+                padding="longest",
+                max_length=self.SEQ_LENGTH,
+                truncation=True,
+                return_tensors="pt",
+            )
+            encoded_batches.append(encoded_batch.to(self.device))
 
-        for question, answer in zip(questions, answers):
-            encoded_qa = self._encode_qa(question, answer)
-            encoded_pairs.append(encoded_qa.to(self.device))
+        return encoded_batches
 
-        return encoded_pairs
+    def get_scores(
+        self, encoded_qa_pairs: List[torch.tensor], num_questions: int = None
+    ) -> List[int]:
+        """Scores encoded QA pairs and returns their indices from best to worst. If
+        num_questions is set, only the indices of the top num_questions pairs are returned.
+        """
+        if not encoded_qa_pairs:
+            return []
 
-    def get_scores(self, encoded_qa_pairs: List[torch.tensor]) -> List[float]:
-        """Generates scores for a list of encoded QA pairs."""
-        scores = {}
+        scores = torch.cat([self._evaluate_qa(batch) for batch in encoded_qa_pairs])
 
-        for i in range(len(encoded_qa_pairs)):
-            scores[i] = self._evaluate_qa(encoded_qa_pairs[i])
+        if num_questions and num_questions < len(scores):
+            return torch.topk(scores, num_questions).indices.tolist()
 
-        return [
-            k for k, v in sorted(scores.items(), key=lambda item: item[1], reverse=True)
-        ]
+        return torch.sort(scores, descending=True, stable=True).indices.tolist()
 
-    def _encode_qa(self, question: str, answer: str) -> torch.tensor:
-        """Concatenates a question and answer, and then tokenizes them. Returns a tensor of
-        input ids corresponding to indices in the vocab.
-        """
+    def _get_correct_answer(self, answer: Any) -> str:
+        """Returns the answer text, picking the correct choice for multiple-choice answers."""
         if type(answer) is list:
             for a in answer:
                 if a["correct"]:
@@ -740,20 +1099,13 @@ class QAEvaluator:
         else:
             correct_answer = answer
 
-        return self.qae_tokenizer(
-            text=question,
-            text_pair=correct_answer,
-            padding="max_length",
-            max_length=self.SEQ_LENGTH,
-            truncation=True,
-            return_tensors="pt",
-        )
+        return correct_answer
 
     @torch.no_grad()
-    def _evaluate_qa(self, encoded_qa_pair: torch.tensor) -> float:
-        """Takes an encoded QA pair and returns a score."""
-        output = self.qae_model(**encoded_qa_pair)
-        return output[0][0][1]
+    def _evaluate_qa(self, encoded_qa_batch: torch.tensor) -> torch.tensor:
+        """Takes a batch of encoded QA pairs and returns one score per pair."""
+        output = self.qae_model(**encoded_qa_batch)
+        return output[0][:, 1].float().cpu()
 
 
 def print_qa(qa_list: List[Mapping[str, str]], show_answers: bool = True) -> None:
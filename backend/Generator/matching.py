@@ -0,0 +1,47 @@
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+
+
+class OptionMatcher:
+    """Picks, for each question, the option closest to the predicted answer.
+
+    Options and answers are embedded as L2-normalized character n-gram counts hashed into
+    n_features columns. Nothing is fitted per question, so the whole request is encoded in
+    one transform call, and short options that share a stem ("neural network" and "neural
+    networks") still overlap where word TF-IDF would see two unrelated tokens.
+    """
+
+    def __init__(self, ngram_range=(2, 4), n_features=2 ** 18):
+        self.vectorizer = HashingVectorizer(
+            analyzer="char_wb",
+            ngram_range=ngram_range,
+            n_features=n_features,
+            alternate_sign=False,
+            norm="l2",
+        )
+
+    def scores(self, options, answers):
+        """Returns a (questions, most options) array of cosine similarities between each
+        question's options and its answer, padded with -inf.
+        """
+        counts = np.array([len(question_options) for question_options in options], dtype=np.int64)
+        flat = [str(option) for question_options in options for option in question_options]
+        vectors = self.vectorizer.transform(flat + [str(answer) for answer in answers])
+        option_vectors, answer_vectors = vectors[:len(flat)], vectors[len(flat):]
+
+        # row i of option_vectors belongs to question owners[i], as its columns[i]-th option
+        owners = np.repeat(np.arange(len(options)), counts)
+        columns = np.arange(len(flat)) - np.repeat(np.cumsum(counts) - counts, counts)
+        similarities = np.asarray(option_vectors.multiply(answer_vectors[owners]).sum(axis=1)).ravel()
+
+        table = np.full((len(options), counts.max(initial=0)), -np.inf)
+        table[owners, columns] = similarities
+        return table
+
+    def best_options(self, options, answers):
+        """Returns the best option of each question, or None for a question without options."""
+        table = self.scores(options, answers)
+        if table.shape[1] == 0:
+            return [None] * len(options)
+        best = table.argmax(axis=1)
+        return [question_options[i] if question_options else None for question_options, i in zip(options, best)]
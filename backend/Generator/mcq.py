@@ -1,16 +1,12 @@
+import re
 import string
-import nltk
-import pke
-import torch
+import hashlib
+import threading
+import numpy as np
 from nltk.tokenize import sent_tokenize
 from flashtext import KeywordProcessor
-from nltk.corpus import stopwords
-from sense2vec import Sense2Vec
-from similarity.normalized_levenshtein import NormalizedLevenshtein
-
-nltk.download('brown')
-nltk.download('stopwords')
-nltk.download('popular')
+from Generator.keyphrases import get_keyphrase_extractor
+from Generator.encoding import BUCKET_SIZE, DEFAULT_POLICIES, bucketed_generate, iter_bucketed_generate
 
 def is_word_available(word, s2v_model):
     word = word.replace(" ", "_")
@@ -20,8 +16,11 @@ def is_word_available(word, s2v_model):
     else:
         return False
 
+VARIATION_LETTERS = 'abcdefghijklmnopqrstuvwxyz ' + string.punctuation
+VARIATION_ALPHABET = frozenset(VARIATION_LETTERS)
+
 def generate_word_variations(word):
-    letters = 'abcdefghijklmnopqrstuvwxyz ' + string.punctuation
+    letters = VARIATION_LETTERS
     splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
     deletes = [L + R[1:] for L, R in splits if R]
     transposes = [L + R[1] + R[0] + R[2:] for L, R in splits if len(R) > 1]
@@ -29,13 +28,52 @@ def generate_word_variations(word):
     inserts = [L + c + R for L, R in splits for c in letters]
     return set(deletes + transposes + replaces + inserts)
 
+def is_one_edit_away(word, candidate, alphabet=VARIATION_ALPHABET):
+    """Returns True if candidate is in generate_word_variations(word), i.e. it is one delete,
+    adjacent transpose, replace or insert away from word, without building the variation set.
+    Replaced and inserted characters must come from alphabet, as in generate_word_variations.
+    """
+    n, m = len(word), len(candidate)
+
+    if m == n:
+        i = 0
+        while i < n and word[i] == candidate[i]:
+            i += 1
+        if i == n:
+            # word maps to itself by replacing a letter with itself or swapping a double letter
+            return any(c in alphabet for c in word) or any(word[k] == word[k + 1] for k in range(n - 1))
+        j = n - 1
+        while word[j] == candidate[j]:
+            j -= 1
+        if i == j:
+            return candidate[i] in alphabet
+        return j == i + 1 and word[i] == candidate[j] and word[j] == candidate[i]
+
+    if m == n - 1:
+        i = 0
+        while i < m and word[i] == candidate[i]:
+            i += 1
+        while i < m and word[i + 1] == candidate[i]:
+            i += 1
+        return i == m
+
+    if m == n + 1:
+        i = 0
+        while i < n and word[i] == candidate[i]:
+            i += 1
+        if candidate[i] not in alphabet:
+            return False
+        while i < n and word[i] == candidate[i + 1]:
+            i += 1
+        return i == n
+
+    return False
+
 def find_similar_words(word, s2v_model):
     output = []
     word_preprocessed = word.translate(word.maketrans("", "", string.punctuation))
     word_preprocessed = word_preprocessed.lower()
 
-    word_variations = generate_word_variations(word_preprocessed)
-
     word = word.replace(" ", "_")
 
     sense = s2v_model.get_best_sense(word)
@@ -47,7 +85,7 @@ def find_similar_words(word, s2v_model):
         append_word = append_word.strip()
         append_word_processed = append_word.lower()
         append_word_processed = append_word_processed.translate(word.maketrans("", "", string.punctuation))
-        if append_word_processed not in compare_list and word_preprocessed not in append_word_processed and append_word_processed not in word_variations:
+        if append_word_processed not in compare_list and word_preprocessed not in append_word_processed and not is_one_edit_away(word_preprocessed, append_word_processed):
             output.append(append_word.title())
             compare_list.append(append_word_processed)
 
@@ -100,34 +138,90 @@ def are_words_distant(words_list, current_word, threshold, normalized_levenshtei
     score_list = [normalized_levenshtein.distance(word.lower(), current_word.lower()) for word in words_list]
     return min(score_list) >= threshold
 
-def filter_useful_phrases(phrase_keys, max_count, normalized_levenshtein):
+def levenshtein_distances(word, others):
+    """Levenshtein distance from word to every string in others. The DP table is filled one
+    row per character of word for all of others at once; insertions along a row are resolved
+    with a running minimum instead of a Python loop.
+    """
+    lengths = np.array([len(o) for o in others], dtype=np.int64)
+    codes = np.full((len(others), lengths.max() if len(others) else 0), -1, dtype=np.int64)
+    for row, other in enumerate(others):
+        codes[row, :len(other)] = [ord(c) for c in other]
+
+    cols = np.arange(codes.shape[1] + 1)
+    prev = np.tile(cols, (len(others), 1))
+    for i, ch in enumerate(word, 1):
+        cur = np.empty_like(prev)
+        cur[:, 0] = i
+        cur[:, 1:] = np.minimum(prev[:, 1:] + 1, prev[:, :-1] + (codes != ord(ch)))
+        cur = np.minimum.accumulate(cur - cols, axis=1) + cols
+        prev = cur
+
+    return prev[np.arange(len(others)), lengths], lengths
+
+def normalized_levenshtein_distances(word, others):
+    """Vectorized NormalizedLevenshtein.distance(word, other) for every string in others."""
+    distances, lengths = levenshtein_distances(word, others)
+    # strsim's Levenshtein returns 0 when the second string is empty; keep that so the
+    # filter selects exactly the same phrases
+    distances = np.where(lengths == 0, 0, distances)
+    longest = np.maximum(lengths, len(word))
+    return np.where(longest > 0, distances / np.maximum(longest, 1), 0.0)
+
+def filter_useful_phrases(phrase_keys, max_count, normalized_levenshtein, threshold=0.7):
+    """Greedily keeps phrases whose normalized Levenshtein distance to every phrase kept so far
+    is at least threshold. Each newly kept phrase is compared against all remaining phrases in
+    one batched call, so the loop only reads a running minimum.
+    """
     filtered_phrases = []
     if phrase_keys:
-        filtered_phrases.append(phrase_keys[0])
-        for ph in phrase_keys[1:]:
-            if are_words_distant(filtered_phrases, ph, 0.7, normalized_levenshtein):
-                filtered_phrases.append(ph)
+        lowered = [ph.lower() for ph in phrase_keys]
+        min_distance = np.full(len(phrase_keys), np.inf)
+
+        def keep(index):
+            filtered_phrases.append(phrase_keys[index])
+            rest = lowered[index + 1:]
+            if rest and (index == 0 or len(filtered_phrases) < max_count):
+                min_distance[index + 1:] = np.minimum(min_distance[index + 1:], normalized_levenshtein_distances(lowered[index], rest))
+
+        keep(0)
+        for index in range(1, len(phrase_keys)):
+            if min_distance[index] >= threshold:
+                keep(index)
             if len(filtered_phrases) >= max_count:
                 break
     return filtered_phrases
 
-def extract_noun_phrases(text):
-    out = []
-    extractor = pke.unsupervised.MultipartiteRank()
-    extractor.load_document(input=text, language='en')
-    pos = {'PROPN', 'NOUN'}
-    stoplist = list(string.punctuation)
-    stoplist += stopwords.words('english')
-    extractor.candidate_selection(pos=pos)
-    try:
-        extractor.candidate_weighting(alpha=1.1, threshold=0.75, method='average')
-    except Exception as e:
-        print(f"Error in candidate weighting: {e}")
-        return out
-
-    keyphrases = extractor.get_n_best(n=10)
-    out = [key[0] for key in keyphrases]
-    return out
+def filter_near_duplicates(texts, max_count, threshold=0.6, ngram=2):
+    """Greedily keeps texts whose Jaccard similarity to every text kept so far is below
+    threshold, comparing their sets of words and word n-grams. The similarities of all pairs
+    come from one product of binary shingle matrices, so the loop only reads a running maximum.
+    """
+    if not texts:
+        return []
+    shingles = []
+    for text in texts:
+        words = re.findall(r"\w+", text.lower())
+        shingles.append(set(words) | {" ".join(words[i:i + ngram]) for i in range(len(words) - ngram + 1)})
+    vocabulary = {gram: i for i, gram in enumerate(set().union(*shingles))}
+    vectors = np.zeros((len(texts), len(vocabulary)), dtype=np.float32)
+    for row, grams in enumerate(shingles):
+        vectors[row, [vocabulary[gram] for gram in grams]] = 1
+
+    intersection = vectors @ vectors.T
+    sizes = vectors.sum(axis=1)
+    union = sizes[:, None] + sizes[None, :] - intersection
+    similarity = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+    kept = []
+    max_similarity = np.zeros(len(texts), dtype=np.float32)
+    for index in range(len(texts)):
+        if max_similarity[index] < threshold:
+            kept.append(index)
+            if len(kept) >= max_count:
+                break
+            max_similarity = np.maximum(max_similarity, similarity[index])
+    return [texts[index] for index in kept]
 
 def extract_phrases_from_doc(doc):
     phrases = {}
@@ -145,11 +239,14 @@ def extract_phrases_from_doc(doc):
     phrase_keys = phrase_keys[:50]
     return phrase_keys
 
-def identify_keywords(nlp_model, text, max_keywords, s2v_model, fdist, normalized_levenshtein, num_sentences):
-    doc = nlp_model(text)
+def identify_keywords(nlp_model, text, max_keywords, s2v_model, fdist, normalized_levenshtein, num_sentences, doc=None, noun_phrases=None):
+    if doc is None:
+        doc = nlp_model(text)
     max_keywords = int(max_keywords)
 
-    keywords = extract_noun_phrases(text)
+    if noun_phrases is None:
+        noun_phrases = get_keyphrase_extractor(nlp_model).extract(tokenize_into_sentences(text))
+    keywords = noun_phrases
     keywords = sorted(keywords, key=lambda x: fdist[x])
     keywords = filter_useful_phrases(keywords, max_keywords, normalized_levenshtein)
 
@@ -168,28 +265,90 @@ def identify_keywords(nlp_model, text, max_keywords, s2v_model, fdist, normalize
     answers = answers[:max_keywords]
     return answers
 
-def generate_multiple_choice_questions(keyword_sent_mapping, device, tokenizer, model, sense2vec_model, normalized_levenshtein):
+class DocumentAnalysis:
+    """Sentences, spaCy parse and keyphrase candidates of one input text.
+
+    Built once per request and shared by the MCQ, short-answer and boolean generators
+    so the text is only split, parsed and ranked once. Sentence parses come from the
+    keyphrase extractor's per-sentence cache, so only new or edited sentences are parsed.
+    Keyword to sentence mappings are memoized per max_keywords, since that is the only
+    generator-specific input.
+    """
+
+    def __init__(self, text, nlp_model):
+        self.text = text
+        self.sentences = tokenize_into_sentences(text)
+        self.modified_text = " ".join(self.sentences)
+        extractor = get_keyphrase_extractor(nlp_model)
+        self.parsed = extractor.parse(self.sentences)
+        self.doc = extractor.document(self.parsed)
+        self.noun_phrases = extractor.rank(self.parsed)
+        self._mappings = {}
+        self._lock = threading.Lock()
+
+    def keyword_sentence_mapping(self, max_keywords, s2v_model, fdist, normalized_levenshtein):
+        with self._lock:
+            if max_keywords not in self._mappings:
+                keywords = identify_keywords(None, self.modified_text, max_keywords, s2v_model, fdist, normalized_levenshtein,
+                                             len(self.sentences), doc=self.doc, noun_phrases=self.noun_phrases)
+                keyword_sentence_mapping = find_sentences_with_keywords(keywords, self.sentences)
+
+                for k in keyword_sentence_mapping.keys():
+                    text_snippet = " ".join(keyword_sentence_mapping[k][:3])
+                    keyword_sentence_mapping[k] = text_snippet
+
+                self._mappings[max_keywords] = keyword_sentence_mapping
+            return dict(self._mappings[max_keywords])
+
+def source_key(answer, context):
+    """Identifies a generated question by its answer and the sentences it was generated from."""
+    return hashlib.sha1(f"{answer}\n{context}".encode("utf-8")).hexdigest()
+
+def index_questions(questions, answer_field):
+    return {source_key(question[answer_field], question["context"]): question for question in questions}
+
+def reuse_questions(keyword_sent_mapping, previous):
+    """Splits keyword_sent_mapping into the questions previous (an index_questions dict from an
+    earlier version of the document) already holds for the same answer and source sentences,
+    and the mapping of keywords whose questions must be generated again.
+    """
+    reused, changed = {}, {}
+    for answer, context in keyword_sent_mapping.items():
+        question = previous.get(source_key(answer, context))
+        if question is None:
+            changed[answer] = context
+        else:
+            reused[answer] = question
+    return reused, changed
+
+def merge_questions(keyword_sent_mapping, reused, generated, answer_field):
+    """Orders reused and newly generated questions like keyword_sent_mapping and renumbers them."""
+    by_answer = dict(reused)
+    by_answer.update({question[answer_field]: question for question in generated})
+    merged = []
+    for answer in keyword_sent_mapping:
+        if answer in by_answer:
+            question = dict(by_answer[answer])
+            question["id"] = len(merged) + 1
+            merged.append(question)
+    return merged
+
+def iter_multiple_choice_questions(keyword_sent_mapping, device, tokenizer, model, sense2vec_model, normalized_levenshtein, bucket_size=BUCKET_SIZE, policy=None):
+    """Yields MCQ question dicts as soon as their bucket is decoded and their options are found.
+    Questions arrive in bucket order; each carries its 1-based position in "id".
+    """
     batch_text = []
-    answers = keyword_sent_mapping.keys()
+    answers = list(keyword_sent_mapping.keys())
     for answer in answers:
         txt = keyword_sent_mapping[answer]
         context = "context: " + txt
         text = context + " " + "answer: " + answer + " </s>"
         batch_text.append(text)
 
-    encoding = tokenizer.batch_encode_plus(batch_text, pad_to_max_length=True, return_tensors="pt")
-
     print("Generating questions using the model...")
-    input_ids, attention_masks = encoding["input_ids"].to(device), encoding["attention_mask"].to(device)
-
-    with torch.no_grad():
-        outputs = model.generate(input_ids=input_ids,
-                                 attention_mask=attention_masks,
-                                 max_length=150)
-
-    generated_questions = []
-    for index, answer in enumerate(answers):
-        out = outputs[index, :]
+    policy = policy or DEFAULT_POLICIES["mcq"]
+    for index, out in iter_bucketed_generate(batch_text, tokenizer, model, device, bucket_size, policy=policy):
+        answer = answers[index]
         decoded_question = tokenizer.decode(out, skip_special_tokens=True, clean_up_tokenization_spaces=True)
 
         question_statement = decoded_question.replace("question:", "").strip()
@@ -209,11 +368,14 @@ def generate_multiple_choice_questions(keyword_sent_mapping, device, tokenizer,
             "context": keyword_sent_mapping[answer]
         }
 
-        generated_questions.append(question_data)
+        yield question_data
 
+def generate_multiple_choice_questions(keyword_sent_mapping, device, tokenizer, model, sense2vec_model, normalized_levenshtein, policy=None):
+    generated_questions = list(iter_multiple_choice_questions(keyword_sent_mapping, device, tokenizer, model, sense2vec_model, normalized_levenshtein, policy=policy))
+    generated_questions.sort(key=lambda q: q["id"])
     return {"questions": generated_questions}
 
-def generate_normal_questions(keyword_sent_mapping, device, tokenizer, model):
+def generate_normal_questions(keyword_sent_mapping, device, tokenizer, model, policy=None):
     batch_text = []
     answers = keyword_sent_mapping.keys()
     
@@ -223,21 +385,14 @@ def generate_normal_questions(keyword_sent_mapping, device, tokenizer, model):
         text = context + " " + "answer: " + answer + " </s>"
         batch_text.append(text)
 
-    encoding = tokenizer.batch_encode_plus(batch_text, pad_to_max_length=True, return_tensors="pt")
-
     print("Running model for generation...")
-    input_ids, attention_masks = encoding["input_ids"].to(device), encoding["attention_mask"].to(device)
-
-    with torch.no_grad():
-        outs = model.generate(input_ids=input_ids,
-                              attention_mask=attention_masks,
-                              max_length=150)
+    outs = bucketed_generate(batch_text, tokenizer, model, device, policy=policy or DEFAULT_POLICIES["shortq"])
 
     output_array = {"questions": []}
 
     for index, val in enumerate(answers):
         individual_quest = {}
-        out = outs[index, :]
+        out = outs[index]
         dec = tokenizer.decode(out, skip_special_tokens=True, clean_up_tokenization_spaces=True)
         
         Question = dec.replace('question:', '')
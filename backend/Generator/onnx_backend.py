@@ -0,0 +1,65 @@
+import os
+import argparse
+
+# Exported graphs are cached here, one directory per checkpoint
+ONNX_DIR = os.environ.get("EDUAID_ONNX_DIR", "onnx_models")
+EXPORT_MODELS = [
+    "Roasters/Question-Generator",
+    "Roasters/Boolean-Questions",
+    "iarfmoose/t5-base-question-generator",
+]
+
+
+def export_path(name):
+    return os.path.join(ONNX_DIR, name.replace("/", "--"))
+
+
+def export_model(name, path=None):
+    """Exports a seq2seq checkpoint to encoder, decoder and decoder-with-past ONNX graphs."""
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from Generator.registry import pinned_revision
+
+    path = path or export_path(name)
+    model = ORTModelForSeq2SeqLM.from_pretrained(name, revision=pinned_revision(name), export=True, use_cache=True)
+    model.save_pretrained(path)
+    return path
+
+
+def load_onnx_seq2seq(name, device):
+    """Loads the exported graphs of name under ONNX Runtime, exporting them first if needed.
+
+    The returned model implements generate() through the same GenerationMixin as the PyTorch
+    model and reuses past key/values between decoder steps, so greedy and beam search behave
+    the same while running on ONNX Runtime kernels.
+    """
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    path = export_path(name)
+    if not os.path.isdir(path):
+        print(f"Exporting {name} to ONNX in {path}")
+        export_model(name, path)
+    provider = "CUDAExecutionProvider" if str(device).startswith("cuda") else "CPUExecutionProvider"
+    return ORTModelForSeq2SeqLM.from_pretrained(path, use_cache=True, provider=provider)
+
+
+def onnx_model_bytes(model):
+    save_dir = getattr(model, "model_save_dir", None)
+    if save_dir is None or not os.path.isdir(save_dir):
+        return None
+    return sum(
+        os.path.getsize(os.path.join(save_dir, f))
+        for f in os.listdir(save_dir)
+        if f.endswith(".onnx") or f.endswith(".onnx_data")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the question generation models to ONNX")
+    parser.add_argument("models", nargs="*", default=EXPORT_MODELS, help="Checkpoints to export")
+    args = parser.parse_args()
+    for name in args.models:
+        print(f"Exported {name} to {export_model(name)}")
+
+
+if __name__ == "__main__":
+    main()
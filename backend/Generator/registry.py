@@ -0,0 +1,287 @@
+import os
+import sys
+import json
+import time
+import functools
+import threading
+import torch
+import spacy
+from sense2vec import Sense2Vec
+from nltk import FreqDist
+from nltk.corpus import brown
+from Generator.s2v_index import S2VIndex, DEFAULT_INDEX_PATH, DEFAULT_SOURCE_PATH
+from Generator.frequency import FrequencyTable, DEFAULT_TABLE_PATH
+from Generator.onnx_backend import load_onnx_seq2seq, onnx_model_bytes
+from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, AutoModelForSequenceClassification, AutoModelForQuestionAnswering, T5ForConditionalGeneration, T5Tokenizer
+
+
+# fp32: full precision, bf16: bfloat16 autocast around forward/generate,
+# int8: dynamic int8 quantization of Linear layers (CPU only)
+PRECISIONS = ("fp32", "bf16", "int8")
+DEFAULT_PRECISION = os.environ.get("EDUAID_PRECISION", "fp32")
+
+# Inference backend for seq2seq generators: "torch" or "onnx". EDUAID_BACKEND sets the default
+# and EDUAID_BACKEND_<COMPONENT> (e.g. EDUAID_BACKEND_BOOLQ=onnx) overrides it per generator.
+BACKENDS = ("torch", "onnx")
+
+
+def pinned_revision(name):
+    """Commit that provision.py pinned the Hugging Face checkpoint name to, read from the
+    manifest configure_runtime points EDUAID_HF_MANIFEST at. None loads whatever the cache's
+    main ref resolves to, e.g. for checkpoints that were never provisioned.
+    """
+    path = os.environ.get("EDUAID_HF_MANIFEST")
+    if not path or not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get("huggingface", {}).get(name)
+
+
+def backend_for(component):
+    backend = os.environ.get(f"EDUAID_BACKEND_{component.upper()}", os.environ.get("EDUAID_BACKEND", "torch"))
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid backend {backend} for {component}. Please choose from {BACKENDS}")
+    return backend
+
+
+def default_device():
+    return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+def _autocast(model, device_type, dtype):
+    for method in ("forward", "generate"):
+        if not hasattr(model, method):
+            continue
+        original = getattr(model, method)
+
+        # functools.wraps keeps the original signature visible to generate()'s kwarg checks
+        @functools.wraps(original)
+        def wrapped(*args, __original=original, **kwargs):
+            with torch.autocast(device_type=device_type, dtype=dtype):
+                return __original(*args, **kwargs)
+
+        setattr(model, method, wrapped)
+    return model
+
+
+def apply_precision(model, precision, device):
+    """Converts a freshly loaded model to the requested precision mode."""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Invalid precision {precision}. Please choose from {PRECISIONS}")
+    device_type = torch.device(device).type
+    if precision == "int8":
+        if device_type != "cpu":
+            print(f"Dynamic int8 quantization is CPU only, keeping fp32 on {device}")
+            return model
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    if precision == "bf16":
+        return _autocast(model, device_type, torch.bfloat16)
+    return model
+
+
+def _tensor_bytes(value):
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(v) for v in value)
+    return 0
+
+
+def estimate_memory(obj):
+    """Best-effort estimate of the resident size of a loaded asset, in bytes."""
+    if isinstance(obj, torch.nn.Module):
+        # state_dict also covers the packed weights of dynamically quantized layers
+        return sum(_tensor_bytes(v) for v in obj.state_dict().values())
+    if type(obj).__name__.startswith("ORTModel"):
+        return onnx_model_bytes(obj)
+    if isinstance(obj, Sense2Vec):
+        return obj.vectors.data.nbytes
+    if isinstance(obj, (S2VIndex, FrequencyTable)):
+        # mapped pages are shared between processes, so this overstates per-process cost
+        return obj.nbytes
+    if isinstance(obj, FreqDist):
+        return sys.getsizeof(obj) + sum(sys.getsizeof(k) for k in obj.keys())
+    return None
+
+
+class _Entry:
+    def __init__(self, obj, load_time):
+        self.obj = obj
+        self.load_time = load_time
+        self.refcount = 0
+        self.memory = estimate_memory(obj)
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded models, tokenizers and NLP assets.
+
+    Entries are keyed by (name, device, dtype) and reference counted, so every
+    generator that asks for the same checkpoint shares one copy. An entry is
+    dropped once the last holder releases it. Loads run under a lock of their own
+    key, so different models load in parallel and the registry stays readable.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._loading = {}
+
+    @staticmethod
+    def make_key(name, device=None, dtype=None):
+        return (name, str(device) if device is not None else "cpu", str(dtype) if dtype is not None else "default")
+
+    def acquire(self, name, loader, device=None, dtype=None):
+        """Returns the asset registered under (name, device, dtype), calling loader() to build
+        it on first use, and increments its reference count.
+        """
+        key = self.make_key(name, device, dtype)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refcount += 1
+                return entry.obj
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # another thread may have finished loading it while this one waited
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refcount += 1
+                    return entry.obj
+            start_time = time.time()
+            obj = loader()
+            entry = _Entry(obj, time.time() - start_time)
+            with self._lock:
+                self._entries[key] = entry
+                self._loading.pop(key, None)
+                entry.refcount += 1
+            print(f"Loaded {name} on {key[1]} in {entry.load_time:.2f}s")
+            return entry.obj
+
+    def release(self, name, device=None, dtype=None):
+        key = self.make_key(name, device, dtype)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refcount -= 1
+            if entry.refcount <= 0:
+                del self._entries[key]
+                if key[1].startswith("cuda"):
+                    torch.cuda.empty_cache()
+
+    def is_loaded(self, name, device=None, dtype=None):
+        with self._lock:
+            return self.make_key(name, device, dtype) in self._entries
+
+    def memory_report(self):
+        """Returns one row per loaded asset with its reference count, load time and size."""
+        with self._lock:
+            return [
+                {
+                    "name": name,
+                    "device": device,
+                    "dtype": dtype,
+                    "refcount": entry.refcount,
+                    "load_time": entry.load_time,
+                    "memory_bytes": entry.memory,
+                }
+                for (name, device, dtype), entry in self._entries.items()
+            ]
+
+
+registry = ModelRegistry()
+
+
+class ModelHandle:
+    """Tracks the registry entries acquired by one generator so they can be released together."""
+
+    def __init__(self, registry=registry):
+        self.registry = registry
+        self.keys = []
+
+    def _acquire(self, name, loader, device=None, dtype=None):
+        obj = self.registry.acquire(name, loader, device, dtype)
+        self.keys.append((name, device, dtype))
+        return obj
+
+    @staticmethod
+    def _tokenizer_name(name, kwargs):
+        options = ",".join(f"{k}={v}" for k, v in sorted(kwargs.items()))
+        return f"tokenizer:{name}" + (f"[{options}]" if options else "")
+
+    def t5_tokenizer(self, name, **kwargs):
+        return self._acquire(self._tokenizer_name(name, kwargs), lambda: T5Tokenizer.from_pretrained(name, revision=pinned_revision(name), **kwargs))
+
+    def auto_tokenizer(self, name, **kwargs):
+        return self._acquire(self._tokenizer_name(name, kwargs), lambda: AutoTokenizer.from_pretrained(name, revision=pinned_revision(name), **kwargs))
+
+    def _onnx_model(self, name, device, dtype):
+        if dtype and dtype != "fp32":
+            print(f"Precision {dtype} is not applied to the ONNX backend, loading {name} as exported")
+        return self._acquire(f"onnx:{name}", lambda: load_onnx_seq2seq(name, device), device, "fp32")
+
+    def t5_model(self, name, device, dtype=None, backend="torch"):
+        if backend == "onnx":
+            return self._onnx_model(name, device, dtype)
+        dtype = dtype or DEFAULT_PRECISION
+
+        def load():
+            model = T5ForConditionalGeneration.from_pretrained(name, revision=pinned_revision(name))
+            model.to(device)
+            model.eval()
+            return apply_precision(model, dtype, device)
+        return self._acquire(name, load, device, dtype)
+
+    def seq2seq_model(self, name, device, dtype=None, backend="torch"):
+        if backend == "onnx":
+            return self._onnx_model(name, device, dtype)
+        dtype = dtype or DEFAULT_PRECISION
+
+        def load():
+            model = AutoModelForSeq2SeqLM.from_pretrained(name, revision=pinned_revision(name))
+            model.to(device)
+            model.eval()
+            return apply_precision(model, dtype, device)
+        return self._acquire(name, load, device, dtype)
+
+    def sequence_classifier(self, name, device, dtype=None):
+        dtype = dtype or DEFAULT_PRECISION
+
+        def load():
+            model = AutoModelForSequenceClassification.from_pretrained(name, revision=pinned_revision(name))
+            model.to(device)
+            model.eval()
+            return apply_precision(model, dtype, device)
+        return self._acquire(name, load, device, dtype)
+
+    def question_answering(self, name, device, dtype=None):
+        dtype = dtype or DEFAULT_PRECISION
+
+        def load():
+            model = AutoModelForQuestionAnswering.from_pretrained(name, revision=pinned_revision(name))
+            model.to(device)
+            model.eval()
+            return apply_precision(model, dtype, device)
+        return self._acquire(name, load, device, dtype)
+
+    def spacy(self, name='en_core_web_sm'):
+        return self._acquire(f"spacy:{name}", lambda: spacy.load(name))
+
+    def sense2vec(self, path=DEFAULT_SOURCE_PATH, index_path=DEFAULT_INDEX_PATH):
+        # Prefer the prebuilt memory-mapped neighbour index over the full vector table
+        if index_path and os.path.isdir(index_path):
+            return self._acquire(f"s2v_index:{index_path}", lambda: S2VIndex(index_path))
+        return self._acquire(f"sense2vec:{path}", lambda: Sense2Vec().from_disk(path))
+
+    def brown_fdist(self, table_path=DEFAULT_TABLE_PATH):
+        # Prefer the prebuilt frequency table over walking the Brown corpus at startup
+        if table_path and os.path.isdir(table_path):
+            return self._acquire(f"freq_table:{table_path}", lambda: FrequencyTable(table_path))
+        return self._acquire("fdist:brown", lambda: FreqDist(brown.words()))
+
+    def release(self):
+        for name, device, dtype in self.keys:
+            self.registry.release(name, device, dtype)
+        self.keys = []
@@ -0,0 +1,146 @@
+import os
+import json
+import argparse
+import numpy as np
+
+FORMAT_VERSION = 1
+# Same layout as provision.py, which also exports both paths through configure_runtime
+ASSET_DIR = os.path.abspath(os.environ.get(
+    "EDUAID_ASSET_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+))
+DEFAULT_SOURCE_PATH = os.environ.get("EDUAID_S2V_PATH", os.path.join(ASSET_DIR, "s2v_old"))
+DEFAULT_INDEX_PATH = os.environ.get("EDUAID_S2V_INDEX", os.path.join(ASSET_DIR, "s2v_index"))
+
+
+def build_index(source, output, n=15, batch_size=64, max_keys=None):
+    """Precomputes the top-n neighbours and the best-sense table of a Sense2Vec model and
+    writes them as flat .npy arrays that S2VIndex can memory-map.
+
+    This is an offline step: it runs one cosine similarity pass over the whole vector
+    table, which takes a while for the full reddit vectors.
+    """
+    from sense2vec import Sense2Vec
+
+    s2v = Sense2Vec().from_disk(source)
+    entries = [(s2v.strings[key], row) for key, row in s2v.vectors.key2row.items()]
+    if max_keys:
+        entries = sorted(entries, key=lambda e: s2v.get_freq(e[0], -1), reverse=True)[:max_keys]
+    entries.sort(key=lambda e: e[0].encode("utf-8"))
+
+    keys = [key for key, _ in entries]
+    freqs = np.array([s2v.get_freq(key, -1) for key in keys], dtype=np.int64)
+    data = np.asarray(s2v.vectors.data, dtype=np.float32)[[row for _, row in entries]]
+    norms = np.linalg.norm(data, axis=1, keepdims=True)
+    data = data / np.where(norms == 0, 1, norms)
+
+    neighbours = np.full((len(keys), n), -1, dtype=np.int32)
+    scores = np.zeros((len(keys), n), dtype=np.float32)
+    for start in range(0, len(keys), batch_size):
+        sims = data[start:start + batch_size] @ data.T
+        rows = np.arange(sims.shape[0])
+        # the key itself is always its own best match, so drop it like Sense2Vec.most_similar does
+        sims[rows, start + rows] = -np.inf
+        k = min(n, len(keys) - 1)
+        if k <= 0:
+            continue
+        best = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(sims, best, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        neighbours[start:start + sims.shape[0], :k] = np.take_along_axis(best, order, axis=1)
+        scores[start:start + sims.shape[0], :k] = np.take_along_axis(best_scores, order, axis=1)
+
+    # For each surface form keep the most frequent sense, ties broken like get_best_sense
+    best_sense = {}
+    for i, key in enumerate(keys):
+        text = key.rsplit("|", 1)[0]
+        candidate = (freqs[i], key, i)
+        if text not in best_sense or candidate[:2] > best_sense[text][:2]:
+            best_sense[text] = candidate
+    texts = sorted(best_sense.keys(), key=lambda t: t.encode("utf-8"))
+
+    os.makedirs(output, exist_ok=True)
+    np.save(os.path.join(output, "keys.npy"), np.array([k.encode("utf-8") for k in keys]))
+    np.save(os.path.join(output, "freqs.npy"), freqs)
+    np.save(os.path.join(output, "neighbours.npy"), neighbours)
+    np.save(os.path.join(output, "scores.npy"), scores)
+    np.save(os.path.join(output, "texts.npy"), np.array([t.encode("utf-8") for t in texts]))
+    np.save(os.path.join(output, "text_best.npy"), np.array([best_sense[t][2] for t in texts], dtype=np.int32))
+    with open(os.path.join(output, "meta.json"), "w") as f:
+        json.dump({"version": FORMAT_VERSION, "source": source, "neighbours": n, "keys": len(keys)}, f)
+
+
+class S2VIndex:
+    """Read-only, memory-mapped stand-in for Sense2Vec built by build_index.
+
+    Implements the get_best_sense / most_similar / membership calls used by the MCQ
+    pipeline. Lookups are binary searches over sorted, mmapped key tables, and the
+    pages are shared by every worker process that opens the same directory.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported Sense2Vec index version in {path}: {self.meta.get('version')}")
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode="r")
+
+        self.keys = load("keys.npy")
+        self.freqs = load("freqs.npy")
+        self.neighbours = load("neighbours.npy")
+        self.scores = load("scores.npy")
+        self.texts = load("texts.npy")
+        self.text_best = load("text_best.npy")
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.keys, self.freqs, self.neighbours, self.scores, self.texts, self.text_best))
+
+    @staticmethod
+    def _find(table, value):
+        encoded = value.encode("utf-8")
+        i = int(np.searchsorted(table, encoded))
+        if i < len(table) and table[i] == encoded:
+            return i
+        return None
+
+    def __contains__(self, key):
+        return self._find(self.keys, key) is not None
+
+    def get_best_sense(self, word, ignore_case=True):
+        versions = [word, word.upper(), word.title()] if ignore_case else [word]
+        candidates = []
+        for text in versions:
+            i = self._find(self.texts, text)
+            if i is None:
+                continue
+            row = int(self.text_best[i])
+            candidates.append((int(self.freqs[row]), self.keys[row].decode("utf-8")))
+        return max(candidates)[1] if candidates else None
+
+    def most_similar(self, keys, n=10):
+        key = keys[0] if isinstance(keys, (list, tuple)) else keys
+        row = self._find(self.keys, key) if key is not None else None
+        if row is None:
+            raise ValueError(f"Can't find key {key} in table")
+        return [
+            (self.keys[j].decode("utf-8"), float(score))
+            for j, score in zip(self.neighbours[row][:n], self.scores[row][:n])
+            if j >= 0
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the memory-mapped Sense2Vec neighbour index")
+    parser.add_argument("--source", default=DEFAULT_SOURCE_PATH, help="Sense2Vec model directory")
+    parser.add_argument("--output", default=DEFAULT_INDEX_PATH, help="Directory to write the index to")
+    parser.add_argument("--neighbours", type=int, default=15, help="Neighbours stored per key")
+    parser.add_argument("--batch_size", type=int, default=64)
+    parser.add_argument("--max_keys", type=int, default=None, help="Only index the most frequent keys")
+    args = parser.parse_args()
+    build_index(args.source, args.output, args.neighbours, args.batch_size, args.max_keys)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import os
+import time
+import threading
+from collections import deque
+import torch
+
+# Tuning knobs for the throughput / p99 latency trade-off
+BATCHING_ENABLED = os.environ.get("EDUAID_BATCHING", "1") == "1"
+MAX_BATCH_SIZE = int(os.environ.get("EDUAID_MAX_BATCH_SIZE", 16))
+MAX_WAIT_MS = float(os.environ.get("EDUAID_BATCH_WAIT_MS", 10))
+
+
+class _Request:
+    def __init__(self, rows, kwargs):
+        self.rows = rows
+        self.kwargs = kwargs
+        self.key = tuple(sorted(kwargs.items()))
+        self.enqueued = time.time()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class BatchScheduler:
+    """Collects generate() calls from concurrent requests into one padded batch.
+
+    The scheduler stands in for the model wherever only model.generate is used:
+    callers pass their already-encoded input_ids and attention_mask, padding is
+    stripped per row, rows from every waiting request with the same decoding
+    arguments are re-padded into a single batch, and each caller gets back its
+    own slice of the generated sequences.
+    """
+
+    def __init__(self, model, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.model = model
+        self.pad_token_id = model.config.pad_token_id or 0
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._cond = threading.Condition()
+        self._pending = []
+        self._worker = None
+
+        self._batches = 0
+        self._rows = 0
+        self._last_batch_size = 0
+        self._wait_times = deque(maxlen=1000)
+
+    def generate(self, input_ids, attention_mask=None, **kwargs):
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        rows = [ids[mask.bool()] for ids, mask in zip(input_ids, attention_mask)]
+        request = _Request(rows, kwargs)
+
+        with self._cond:
+            self._ensure_worker()
+            self._pending.append(request)
+            self._cond.notify_all()
+
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def stats(self):
+        with self._cond:
+            queue_depth = sum(len(r.rows) for r in self._pending)
+            waits = sorted(self._wait_times)
+        return {
+            "queue_depth": queue_depth,
+            "batches": self._batches,
+            "last_batch_size": self._last_batch_size,
+            "mean_batch_size": self._rows / self._batches if self._batches else 0,
+            "mean_wait_ms": 1000 * sum(waits) / len(waits) if waits else 0,
+            "p99_wait_ms": 1000 * waits[int(0.99 * (len(waits) - 1))] if waits else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": 1000 * self.max_wait,
+        }
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+
+    def _pending_rows(self, key):
+        return sum(len(r.rows) for r in self._pending if r.key == key)
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            first = self._pending[0]
+            deadline = first.enqueued + self.max_wait
+            while self._pending_rows(first.key) < self.max_batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch, num_rows = [], 0
+            for request in list(self._pending):
+                if request.key != first.key:
+                    continue
+                if batch and num_rows + len(request.rows) > self.max_batch_size:
+                    break
+                batch.append(request)
+                num_rows += len(request.rows)
+                self._pending.remove(request)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._generate_batch(batch)
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            for request in batch:
+                request.done.set()
+
+    def _generate_batch(self, batch):
+        started = time.time()
+        rows = [row for request in batch for row in request.rows]
+        max_len = max(len(row) for row in rows)
+        device = rows[0].device
+
+        input_ids = torch.full((len(rows), max_len), self.pad_token_id, dtype=rows[0].dtype, device=device)
+        attention_mask = torch.zeros((len(rows), max_len), dtype=torch.long, device=device)
+        for i, row in enumerate(rows):
+            input_ids[i, :len(row)] = row
+            attention_mask[i, :len(row)] = 1
+
+        with torch.no_grad():
+            outputs = self.model.generate(input_ids=input_ids, attention_mask=attention_mask, **batch[0].kwargs)
+
+        per_row = batch[0].kwargs.get("num_return_sequences", 1)
+        offset = 0
+        for request in batch:
+            count = len(request.rows) * per_row
+            request.result = outputs[offset:offset + count]
+            offset += count
+            self._wait_times.append(started - request.enqueued)
+
+        self._batches += 1
+        self._rows += len(rows)
+        self._last_batch_size = len(rows)
+
+
+class SerializedModel:
+    """Stands in for the model when batching is disabled. Generators holding the same model
+    instance, e.g. the concurrent /get_problems generators, run their generate() calls on it
+    one at a time instead of calling into one module from several threads.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+
+    def generate(self, *args, **kwargs):
+        with self._lock:
+            return self.model.generate(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self.model, attr)
+
+
+_schedulers = {}
+_serialized = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(model):
+    """Returns the scheduler shared by every generator holding this model instance, or a
+    SerializedModel wrapping it when batching is disabled.
+    """
+    if not BATCHING_ENABLED:
+        with _schedulers_lock:
+            serialized = _serialized.get(id(model))
+            if serialized is None or serialized.model is not model:
+                serialized = SerializedModel(model)
+                _serialized[id(model)] = serialized
+            return serialized
+    with _schedulers_lock:
+        scheduler = _schedulers.get(id(model))
+        if scheduler is None or scheduler.model is not model:
+            scheduler = BatchScheduler(model)
+            _schedulers[id(model)] = scheduler
+        return scheduler
+
+
+def scheduler_stats():
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return [
+        dict(model=getattr(s.model.config, "_name_or_path", ""), **s.stats())
+        for s in schedulers
+    ]
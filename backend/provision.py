@@ -0,0 +1,200 @@
+"""Fetches every model and data asset the backend needs into a local cache, and checks that
+cache offline when the server starts.
+
+    python provision.py           # download and verify everything
+    python provision.py --check   # verify only, exit with status 1 if anything is missing
+"""
+import os
+import sys
+import json
+import time
+import tarfile
+import argparse
+import importlib.util
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSET_DIR = os.path.abspath(os.environ.get("EDUAID_ASSET_DIR", os.path.join(BACKEND_DIR, "assets")))
+NLTK_DIR = os.path.join(ASSET_DIR, "nltk_data")
+HF_DIR = os.path.join(ASSET_DIR, "huggingface")
+MANIFEST_PATH = os.path.join(ASSET_DIR, "manifest.json")
+
+# NLTK package -> resource path checked with nltk.data.find
+NLTK_PACKAGES = {
+    "stopwords": "corpora/stopwords",
+    "punkt_tab": "tokenizers/punkt_tab",
+    "brown": "corpora/brown",
+}
+SPACY_MODELS = ["en_core_web_sm"]
+S2V_DIR = os.path.abspath(os.environ.get("EDUAID_S2V_PATH", os.path.join(ASSET_DIR, "s2v_old")))
+S2V_INDEX_DIR = os.path.abspath(os.environ.get("EDUAID_S2V_INDEX", os.path.join(ASSET_DIR, "s2v_index")))
+S2V_URL = "https://github.com/explosion/sense2vec/releases/download/v1.0.0/s2v_reddit_2015_md.tar.gz"
+QA_CHECKPOINT = "distilbert/distilbert-base-cased-distilled-squad"
+HF_MODELS = [
+    "t5-large",
+    "t5-base",
+    "Roasters/Question-Generator",
+    "Roasters/Boolean-Questions",
+    "Roasters/Answer-Predictor",
+    "typeform/distilbert-base-uncased-mnli",
+    "iarfmoose/t5-base-question-generator",
+    "iarfmoose/bert-base-cased-qa-evaluator",
+    QA_CHECKPOINT,
+]
+HF_IGNORE_PATTERNS = ["*.h5", "*.msgpack", "*.ot", "tf_model*", "flax_model*", "rust_model*", "*.onnx"]
+
+
+def configure_runtime():
+    """Points NLTK and Hugging Face at the provisioned cache and keeps them offline, unless
+    EDUAID_SKIP_ASSET_CHECK=1 lets missing models download on demand. Must run before
+    transformers or huggingface_hub are imported.
+    """
+    os.environ.setdefault("HF_HOME", HF_DIR)
+    os.environ.setdefault("EDUAID_S2V_PATH", S2V_DIR)
+    os.environ.setdefault("EDUAID_S2V_INDEX", S2V_INDEX_DIR)
+    # the registry loads each checkpoint at the revision pinned here
+    os.environ.setdefault("EDUAID_HF_MANIFEST", MANIFEST_PATH)
+    if os.environ.get("EDUAID_SKIP_ASSET_CHECK") != "1":
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+    import nltk
+    if NLTK_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DIR)
+
+
+def _load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)
+
+
+def _sense2vec_present():
+    # the prebuilt neighbour index is preferred at runtime and replaces the full vectors
+    return os.path.isfile(os.path.join(S2V_DIR, "cfg")) or os.path.isfile(os.path.join(S2V_INDEX_DIR, "meta.json"))
+
+
+def find_missing_assets():
+    """Returns a list of human-readable descriptions of assets missing from the cache. Only
+    touches the local filesystem.
+    """
+    import nltk
+    missing = []
+
+    for package, resource in NLTK_PACKAGES.items():
+        try:
+            nltk.data.find(resource, paths=[NLTK_DIR])
+        except LookupError:
+            missing.append(f"nltk:{package}")
+
+    for name in SPACY_MODELS:
+        if importlib.util.find_spec(name) is None:
+            missing.append(f"spacy:{name}")
+
+    if not _sense2vec_present():
+        missing.append(f"sense2vec:{S2V_DIR}")
+
+    revisions = _load_manifest().get("huggingface", {})
+    for repo_id in HF_MODELS:
+        revision = revisions.get(repo_id)
+        snapshot = os.path.join(HF_DIR, "hub", "models--" + repo_id.replace("/", "--"), "snapshots", revision or "")
+        if revision is None or not os.path.isdir(snapshot) or not os.listdir(snapshot):
+            missing.append(f"huggingface:{repo_id}")
+
+    return missing
+
+
+def check_assets_or_exit():
+    """Verifies the cache at startup and exits with a pointer to this script if it is incomplete.
+    Set EDUAID_SKIP_ASSET_CHECK=1 to let models download on demand during development.
+    """
+    if os.environ.get("EDUAID_SKIP_ASSET_CHECK") == "1":
+        return
+    start_time = time.time()
+    missing = find_missing_assets()
+    if missing:
+        print("Missing provisioned assets: " + ", ".join(missing))
+        print("Run `python provision.py` to download them into " + ASSET_DIR)
+        sys.exit(1)
+    print(f"Verified provisioned assets in {time.time() - start_time:.3f}s")
+
+
+def provision_nltk():
+    import nltk
+    os.makedirs(NLTK_DIR, exist_ok=True)
+    for package in NLTK_PACKAGES:
+        if not nltk.download(package, download_dir=NLTK_DIR, quiet=True):
+            raise RuntimeError(f"Failed to download NLTK package {package}")
+
+
+def provision_spacy():
+    from spacy.cli import download
+    for name in SPACY_MODELS:
+        if importlib.util.find_spec(name) is None:
+            download(name)
+
+
+def provision_sense2vec():
+    if _sense2vec_present():
+        return
+    archive = os.path.join(ASSET_DIR, os.path.basename(S2V_URL))
+    if not os.path.exists(archive):
+        print(f"Downloading {S2V_URL}")
+        urllib.request.urlretrieve(S2V_URL, archive)
+    os.makedirs(S2V_DIR, exist_ok=True)
+    # the "data" filter also rejects unsafe members, on Pythons that have it
+    extract_options = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+    with tarfile.open(archive) as tar:
+        for member in tar.getmembers():
+            # strip the top-level directory of the archive, like tar --strip-components=1
+            parts = member.name.split("/", 1)
+            if len(parts) < 2 or not parts[1]:
+                continue
+            member.name = parts[1]
+            target = os.path.realpath(os.path.join(S2V_DIR, member.name))
+            if member.issym() or member.islnk() or os.path.commonpath([S2V_DIR, target]) != S2V_DIR:
+                raise RuntimeError(f"Refusing to extract {member.name!r} outside {S2V_DIR}")
+            tar.extract(member, S2V_DIR, **extract_options)
+
+
+def provision_huggingface():
+    from huggingface_hub import snapshot_download
+    manifest = _load_manifest()
+    revisions = manifest.setdefault("huggingface", {})
+    for repo_id in HF_MODELS:
+        path = snapshot_download(
+            repo_id,
+            revision=revisions.get(repo_id),
+            cache_dir=os.path.join(HF_DIR, "hub"),
+            ignore_patterns=HF_IGNORE_PATTERNS,
+        )
+        # the snapshot directory name is the resolved commit, which pins later checks and loads
+        revisions[repo_id] = os.path.basename(path)
+        print(f"Provisioned {repo_id}@{revisions[repo_id]}")
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download and verify the backend's model and data assets")
+    parser.add_argument("--check", action="store_true", help="Only verify the cache")
+    args = parser.parse_args()
+
+    os.makedirs(ASSET_DIR, exist_ok=True)
+    if not args.check:
+        provision_nltk()
+        provision_spacy()
+        provision_sense2vec()
+        provision_huggingface()
+        if os.path.exists(os.path.join(ASSET_DIR, os.path.basename(S2V_URL))):
+            os.remove(os.path.join(ASSET_DIR, os.path.basename(S2V_URL)))
+
+    missing = find_missing_assets()
+    if missing:
+        print("Missing assets: " + ", ".join(missing))
+        sys.exit(1)
+    print("All assets present in " + ASSET_DIR)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ REPO_URL="https://github.com/AOSSIE-Org/EduAid.git"
 S2V_URL="https://github.com/explosion/sense2vec/releases/download/v1.0.0/s2v_reddit_2015_md.tar.gz"
 REPO_DIR="Inquizzitive"
 S2V_ARCHIVE="s2v_reddit_2015_md.tar.gz"
-S2V_DIR="s2v_old"
+S2V_DIR="backend/assets/s2v_old"
 
 if [ ! -d "venv" ]; then
   python3 -m venv venv
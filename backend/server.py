@@ -1,20 +1,30 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from pprint import pprint
 import nltk
 import subprocess
 import os
 import glob
-
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
-nltk.download("stopwords")
-nltk.download('punkt_tab')
+import time
+import atexit
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import provision
+provision.configure_runtime()
+provision.check_assets_or_exit()
 from Generator import main
+from Generator.registry import registry, backend_for, DEFAULT_PRECISION
+from Generator.scheduler import scheduler_stats
+from Generator.cache import ResultCache
+from Generator.loader import ModelLoader, ModelNotReady, ModelLoadFailed
+from Generator.matching import OptionMatcher
+from Generator.mcq import index_questions
+from Generator.encoding import DecodingPolicy, request_policy
+from Generator.jobs import JobQueue, WorkerPool, JOB_HANDLERS, FINISHED, DONE, CANCELLED
 import re
 import json
 import spacy
-from transformers import pipeline
 from spacy.lang.en.stop_words import STOP_WORDS
 from string import punctuation
 from heapq import nlargest
@@ -32,15 +42,168 @@ print("Starting Flask App...")
 SERVICE_ACCOUNT_FILE = './service_account_key.json'
 SCOPES = ['https://www.googleapis.com/auth/documents.readonly']
 
-MCQGen = main.MCQGenerator()
-answer = main.AnswerPredictor()
-BoolQGen = main.BoolQGenerator()
-ShortQGen = main.ShortQGenerator()
-qg = main.QuestionGenerator()
+# With EDUAID_LAZY_LOADING=1 the server starts listening right away and loads the models below
+# on a background thread in priority order. Routes whose models are not ready yet either wait
+# for them (EDUAID_NOT_READY=block) or answer 503.
+LAZY_LOADING = os.environ.get("EDUAID_LAZY_LOADING", "0") == "1"
+models = ModelLoader(block=os.environ.get("EDUAID_NOT_READY", "503") == "block")
+models.register("mcq", main.MCQGenerator, priority=0)
+models.register("shortq", main.ShortQGenerator, priority=1)
+models.register("boolq", main.BoolQGenerator, priority=2)
+models.register("answer", main.AnswerPredictor, priority=3)
+models.register(
+    "qa",
+    lambda: main.ExtractiveQA(provision.QA_CHECKPOINT, batch_size=int(os.environ.get("EDUAID_QA_BATCH_SIZE", 32))),
+    priority=4,
+)
+models.register("qg", main.QuestionGenerator, priority=5)
+
+MCQGen = models.proxy("mcq")
+answer = models.proxy("answer")
+BoolQGen = models.proxy("boolq")
+ShortQGen = models.proxy("shortq")
+qg = models.proxy("qg")
+qa_model = models.proxy("qa")
+
+# Models each route needs, reported per endpoint by /health
+ENDPOINT_MODELS = {
+    "get_mcq": ["mcq"],
+    "get_boolq": ["boolq"],
+    "get_shortq": ["shortq"],
+    "get_problems": ["mcq", "boolq", "shortq"],
+    "get_mcq_answer": ["qa"],
+    "get_shortq_answer": ["qa"],
+    "get_boolean_answer": ["answer"],
+    "get_shortq_hard": ["qg"],
+    "get_mcq_hard": ["qg"],
+}
+
+if LAZY_LOADING:
+    models.start()
+else:
+    for name in models.order():
+        models.load(name)
+
 docs_service = main.GoogleDocsService(SERVICE_ACCOUNT_FILE, SCOPES)
 file_processor = main.FileProcessor()
 mediawikiapi = MediaWikiAPI()
-qa_model = pipeline("question-answering")
+problems_executor = ThreadPoolExecutor(max_workers=3)
+option_matcher = OptionMatcher()
+
+# Generators are seeded, so identical requests produce identical questions and can be cached.
+# Bump EDUAID_MODEL_VERSION whenever a checkpoint changes to invalidate old entries.
+MODEL_VERSION = os.environ.get("EDUAID_MODEL_VERSION", "Roasters/Question-Generator;Roasters/Boolean-Questions;s2v_old")
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("EDUAID_CACHE_SIZE", 256)),
+    disk_path=os.environ.get("EDUAID_CACHE_PATH"),
+    max_disk_entries=int(os.environ.get("EDUAID_CACHE_DISK_SIZE", 10000)),
+    ttl=float(os.environ.get("EDUAID_CACHE_TTL", 7 * 24 * 3600)),
+)
+
+# Long generations can be submitted as jobs to POST /jobs instead. They are kept in a SQLite
+# queue and run by EDUAID_JOB_WORKERS worker processes, each holding its own models. With 0
+# workers the server only queues jobs, for workers started separately with python worker.py.
+job_queue = JobQueue(
+    os.environ.get("EDUAID_JOB_DB", "jobs.sqlite3"),
+    ttl=float(os.environ.get("EDUAID_JOB_TTL", 24 * 3600)),
+)
+job_workers = WorkerPool(job_queue, workers=int(os.environ.get("EDUAID_JOB_WORKERS", 1)))
+job_workers.start()
+atexit.register(job_workers.stop)
+
+
+def requires_models(endpoint):
+    """Makes sure the models behind endpoint are loaded before the route runs, answering 503
+    while they are still warming up and 500 if one of them failed to load.
+    """
+    def decorator(route):
+        @functools.wraps(route)
+        def wrapper(*args, **kwargs):
+            try:
+                models.ensure(*ENDPOINT_MODELS[endpoint])
+            except ModelNotReady as e:
+                return jsonify({"error": str(e), "loading": e.names}), 503, {"Retry-After": "10"}
+            except ModelLoadFailed as e:
+                return jsonify({"error": str(e), "failed": e.errors}), 500
+            return route(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def stream_response(items):
+    """Streams items as NDJSON, or as Server-Sent Events when the client accepts
+    text/event-stream, and ends with a {"done": true} record.
+    """
+    use_sse = "text/event-stream" in request.headers.get("Accept", "")
+
+    def format_record(record, event=None):
+        line = json.dumps(record)
+        if not use_sse:
+            return line + "\n"
+        return (f"event: {event}\n" if event else "") + f"data: {line}\n\n"
+
+    def generate():
+        count = 0
+        try:
+            for item in items:
+                count += 1
+                yield format_record(item)
+        except Exception as e:
+            yield format_record({"error": str(e)}, "error")
+        yield format_record({"done": True, "count": count}, "done")
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def invalid_decoding(decoding):
+    """Checks a request's optional "decoding" overrides and returns a 400 response if they are invalid."""
+    if decoding is None:
+        return None
+    try:
+        if not isinstance(decoding, dict):
+            raise ValueError("expected an object")
+        DecodingPolicy().replace(**decoding)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid decoding options: {e}"}), 400
+    return None
+
+
+def generation_settings(component, policy, decoding=None):
+    """Everything besides the request that shapes a generator's output: its decoding policy with
+    the request's overrides applied, and the precision and backend its model runs with. Cache
+    keys include it, so changing EDUAID_DECODING_*, EDUAID_PRECISION or EDUAID_BACKEND does not
+    serve questions generated under the old settings from the disk cache.
+    """
+    return {
+        "decoding": request_policy(policy, {"decoding": decoding}).to_dict(),
+        "precision": DEFAULT_PRECISION,
+        "backend": backend_for(component),
+    }
+
+
+def boolq_policy(mode):
+    return BoolQGen.anchored_decoding if mode == "anchored" else BoolQGen.decoding
+
+
+def incremental_questions(endpoint, document_id, key, generate, answer_field, **params):
+    """Generates the questions for a new version of document_id, taking every question whose
+    answer and source sentences are unchanged since the last version from the cache. Returns
+    the questions and how many were reused.
+    """
+    document_key = result_cache.make_key(endpoint, "", MODEL_VERSION, document_id=document_id, **params)
+    questions = result_cache.get(key)
+    if questions is not None:
+        reused = len(questions)
+    else:
+        output = generate(result_cache.get(document_key) or {})
+        questions, reused = output["questions"], output["reused"]
+        result_cache.put(key, questions)
+    result_cache.put(document_key, index_questions(questions, answer_field))
+    return questions, reused
 
 
 def process_input_text(input_text, use_mediawiki):
@@ -50,48 +213,126 @@ def process_input_text(input_text, use_mediawiki):
 
 
 @app.route("/get_mcq", methods=["POST"])
+@requires_models("get_mcq")
 def get_mcq():
     data = request.get_json()
     input_text = data.get("input_text", "")
     use_mediawiki = data.get("use_mediawiki", 0)
     max_questions = data.get("max_questions", 4)
-    input_text = process_input_text(input_text, use_mediawiki)
-    output = MCQGen.generate_mcq(
-        {"input_text": input_text, "max_questions": max_questions}
-    )
-    questions = output["questions"]
+    document_id = data.get("document_id")
+    decoding = data.get("decoding")
+    if invalid_decoding(decoding):
+        return invalid_decoding(decoding)
+    settings = generation_settings("mcq", MCQGen.decoding, decoding)
+    key = result_cache.make_key("get_mcq", input_text, MODEL_VERSION, use_mediawiki=use_mediawiki, max_questions=max_questions, settings=settings)
+
+    def generate(previous=None):
+        return MCQGen.generate_mcq(
+            {"input_text": process_input_text(input_text, use_mediawiki), "max_questions": max_questions, "decoding": decoding},
+            previous=previous,
+        )
+
+    if document_id is not None:
+        questions, reused = incremental_questions(
+            "get_mcq", document_id, key, generate, "answer", use_mediawiki=use_mediawiki, max_questions=max_questions, settings=settings
+        )
+        return jsonify({"output": questions, "document_id": document_id, "reused": reused})
+
+    questions = result_cache.get_or_compute(key, lambda: generate()["questions"])
     return jsonify({"output": questions})
 
 
+@app.route("/get_mcq/stream", methods=["POST"])
+@requires_models("get_mcq")
+def get_mcq_stream():
+    data = request.get_json()
+    input_text = data.get("input_text", "")
+    use_mediawiki = data.get("use_mediawiki", 0)
+    max_questions = data.get("max_questions", 4)
+    decoding = data.get("decoding")
+    if invalid_decoding(decoding):
+        return invalid_decoding(decoding)
+    settings = generation_settings("mcq", MCQGen.decoding, decoding)
+    key = result_cache.make_key("get_mcq", input_text, MODEL_VERSION, use_mediawiki=use_mediawiki, max_questions=max_questions, settings=settings)
+
+    cached = result_cache.get(key)
+    if cached is not None:
+        return stream_response(cached)
+
+    def generate():
+        questions = []
+        for question in MCQGen.generate_mcq_stream(
+            {"input_text": process_input_text(input_text, use_mediawiki), "max_questions": max_questions, "decoding": decoding}
+        ):
+            questions.append(question)
+            yield question
+        # like /get_mcq, only cache a generation that produced questions
+        if questions:
+            result_cache.put(key, sorted(questions, key=lambda q: q["id"]))
+
+    return stream_response(generate())
+
+
 @app.route("/get_boolq", methods=["POST"])
+@requires_models("get_boolq")
 def get_boolq():
     data = request.get_json()
     input_text = data.get("input_text", "")
     use_mediawiki = data.get("use_mediawiki", 0)
     max_questions = data.get("max_questions", 4)
-    input_text = process_input_text(input_text, use_mediawiki)
-    output = BoolQGen.generate_boolq(
-        {"input_text": input_text, "max_questions": max_questions}
-    )
-    boolean_questions = output["Boolean_Questions"]
+    decoding = data.get("decoding")
+    mode = data.get("mode")
+    if invalid_decoding(decoding):
+        return invalid_decoding(decoding)
+    if mode is not None and mode not in main.BoolQGenerator.MODES:
+        return jsonify({"error": f"Invalid mode {mode}. Please choose from {list(main.BoolQGenerator.MODES)}"}), 400
+    # key on the mode actually used, so changing EDUAID_BOOLQ_MODE does not serve old questions
+    mode = mode or BoolQGen.mode
+    settings = generation_settings("boolq", boolq_policy(mode), decoding)
+    key = result_cache.make_key("get_boolq", input_text, MODEL_VERSION, use_mediawiki=use_mediawiki, max_questions=max_questions, settings=settings, mode=mode)
+
+    def generate():
+        output = BoolQGen.generate_boolq(
+            {"input_text": process_input_text(input_text, use_mediawiki), "max_questions": max_questions, "decoding": decoding, "mode": mode}
+        )
+        return output["Boolean_Questions"]
+
+    boolean_questions = result_cache.get_or_compute(key, generate)
     return jsonify({"output": boolean_questions})
 
 
 @app.route("/get_shortq", methods=["POST"])
+@requires_models("get_shortq")
 def get_shortq():
     data = request.get_json()
     input_text = data.get("input_text", "")
     use_mediawiki = data.get("use_mediawiki", 0)
     max_questions = data.get("max_questions", 4)
-    input_text = process_input_text(input_text, use_mediawiki)
-    output = ShortQGen.generate_shortq(
-        {"input_text": input_text, "max_questions": max_questions}
-    )
-    questions = output["questions"]
+    document_id = data.get("document_id")
+    decoding = data.get("decoding")
+    if invalid_decoding(decoding):
+        return invalid_decoding(decoding)
+    settings = generation_settings("shortq", ShortQGen.decoding, decoding)
+    key = result_cache.make_key("get_shortq", input_text, MODEL_VERSION, use_mediawiki=use_mediawiki, max_questions=max_questions, settings=settings)
+
+    def generate(previous=None):
+        return ShortQGen.generate_shortq(
+            {"input_text": process_input_text(input_text, use_mediawiki), "max_questions": max_questions, "decoding": decoding},
+            previous=previous,
+        )
+
+    if document_id is not None:
+        questions, reused = incremental_questions(
+            "get_shortq", document_id, key, generate, "Answer", use_mediawiki=use_mediawiki, max_questions=max_questions, settings=settings
+        )
+        return jsonify({"output": questions, "document_id": document_id, "reused": reused})
+
+    questions = result_cache.get_or_compute(key, lambda: generate()["questions"])
     return jsonify({"output": questions})
 
 
 @app.route("/get_problems", methods=["POST"])
+@requires_models("get_problems")
 def get_problems():
     data = request.get_json()
     input_text = data.get("input_text", "")
@@ -99,21 +340,35 @@ def get_problems():
     max_questions_mcq = data.get("max_questions_mcq", 4)
     max_questions_boolq = data.get("max_questions_boolq", 4)
     max_questions_shortq = data.get("max_questions_shortq", 4)
-    input_text = process_input_text(input_text, use_mediawiki)
-    output1 = MCQGen.generate_mcq(
-        {"input_text": input_text, "max_questions": max_questions_mcq}
-    )
-    output2 = BoolQGen.generate_boolq(
-        {"input_text": input_text, "max_questions": max_questions_boolq}
-    )
-    output3 = ShortQGen.generate_shortq(
-        {"input_text": input_text, "max_questions": max_questions_shortq}
-    )
-    return jsonify(
-        {"output_mcq": output1, "output_boolq": output2, "output_shortq": output3}
+    key = result_cache.make_key(
+        "get_problems", input_text, MODEL_VERSION, use_mediawiki=use_mediawiki,
+        max_questions_mcq=max_questions_mcq, max_questions_boolq=max_questions_boolq, max_questions_shortq=max_questions_shortq,
+        settings={
+            "mcq": generation_settings("mcq", MCQGen.decoding),
+            "boolq": dict(generation_settings("boolq", boolq_policy(BoolQGen.mode)), mode=BoolQGen.mode),
+            "shortq": generation_settings("shortq", ShortQGen.decoding),
+        },
     )
 
+    def generate():
+        text = process_input_text(input_text, use_mediawiki)
+        # Split, parse and rank the document once, then run the three generators side by side
+        analysis = MCQGen.analyze(text)
+        future1 = problems_executor.submit(
+            MCQGen.generate_mcq, {"input_text": text, "max_questions": max_questions_mcq}, analysis
+        )
+        future2 = problems_executor.submit(
+            BoolQGen.generate_boolq, {"input_text": text, "max_questions": max_questions_boolq}, analysis
+        )
+        future3 = problems_executor.submit(
+            ShortQGen.generate_shortq, {"input_text": text, "max_questions": max_questions_shortq}, analysis
+        )
+        return {"output_mcq": future1.result(), "output_boolq": future2.result(), "output_shortq": future3.result()}
+
+    return jsonify(result_cache.get_or_compute(key, generate))
+
 @app.route("/get_mcq_answer", methods=["POST"])
+@requires_models("get_mcq_answer")
 def get_mcq_answer():
     data = request.get_json()
     input_text = data.get("input_text", "")
@@ -124,56 +379,38 @@ def get_mcq_answer():
     if not input_questions or not input_options or len(input_questions) != len(input_options):
         return jsonify({"outputs": outputs})
 
-    for question, options in zip(input_questions, input_options):
-        # Generate answer using the QA model
-        qa_response = qa_model(question=question, context=input_text)
-        generated_answer = qa_response["answer"]
-
-        # Calculate similarity between generated answer and each option
-        options_with_answer = options + [generated_answer]
-        vectorizer = TfidfVectorizer().fit_transform(options_with_answer)
-        vectors = vectorizer.toarray()
-        generated_answer_vector = vectors[-1].reshape(1, -1)
+    # Answer every question against the shared context in batched passes
+    qa_responses = qa_model.answer(input_text, input_questions)
 
-        similarities = cosine_similarity(vectors[:-1], generated_answer_vector).flatten()
-        max_similarity_index = similarities.argmax()
-
-        # Return the option with the highest similarity
-        best_option = options[max_similarity_index]
-        
-        outputs.append(best_option)
+    # Score every option of every question against its answer in one pass
+    outputs = option_matcher.best_options(input_options, [qa_response["answer"] for qa_response in qa_responses])
 
     return jsonify({"output": outputs})
 
 
 @app.route("/get_shortq_answer", methods=["POST"])
+@requires_models("get_shortq_answer")
 def get_answer():
     data = request.get_json()
     input_text = data.get("input_text", "")
     input_questions = data.get("input_question", [])
-    answers = []
-    for question in input_questions:
-        qa_response = qa_model(question=question, context=input_text)
-        answers.append(qa_response["answer"])
+    qa_responses = qa_model.answer(input_text, input_questions)
+    answers = [qa_response["answer"] for qa_response in qa_responses]
 
-    return jsonify({"output": answers})
+    return jsonify({"output": answers, "answers": qa_responses})
 
 
 @app.route("/get_boolean_answer", methods=["POST"])
+@requires_models("get_boolean_answer")
 def get_boolean_answer():
     data = request.get_json()
     input_text = data.get("input_text", "")
     input_questions = data.get("input_question", [])
-    output = []
-
-    for question in input_questions:
-        qa_response = answer.predict_boolean_answer(
-            {"input_text": input_text, "input_question": question}
-        )
-        if(qa_response):
-            output.append("True")
-        else:
-            output.append("False")
+    # one batched NLI pass for the whole quiz
+    qa_response = answer.predict_boolean_answer(
+        {"input_text": input_text, "input_question": input_questions}
+    )
+    output = ["True" if prediction else "False" for prediction in qa_response]
 
     return jsonify({"output": output})
 
@@ -364,6 +601,7 @@ def generate_gform():
 
 
 @app.route("/get_shortq_hard", methods=["POST"])
+@requires_models("get_shortq_hard")
 def get_shortq_hard():
     data = request.get_json()
     input_text = data.get("input_text", "")
@@ -376,7 +614,18 @@ def get_shortq_hard():
     return jsonify({"output": output})
 
 
+@app.route("/get_shortq_hard/stream", methods=["POST"])
+@requires_models("get_shortq_hard")
+def get_shortq_hard_stream():
+    data = request.get_json()
+    input_text = data.get("input_text", "")
+    use_mediawiki = data.get("use_mediawiki", 0)
+    input_text = process_input_text(input_text,use_mediawiki)
+    return stream_response(qg.generate_stream(article=input_text, answer_style="sentences"))
+
+
 @app.route("/get_mcq_hard", methods=["POST"])
+@requires_models("get_mcq_hard")
 def get_mcq_hard():
     data = request.get_json()
     input_text = data.get("input_text", "")
@@ -388,6 +637,15 @@ def get_mcq_hard():
     )
     return jsonify({"output": output})
 
+@app.route("/get_mcq_hard/stream", methods=["POST"])
+@requires_models("get_mcq_hard")
+def get_mcq_hard_stream():
+    data = request.get_json()
+    input_text = data.get("input_text", "")
+    use_mediawiki = data.get("use_mediawiki", 0)
+    input_text = process_input_text(input_text,use_mediawiki)
+    return stream_response(qg.generate_stream(article=input_text, answer_style="multiple_choice"))
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     if 'file' not in request.files:
@@ -405,10 +663,105 @@ def upload_file():
     else:
         return jsonify({"error": "Unsupported file type or error processing file"}), 400
 
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    # JSON body, or a multipart form whose file is ingested by the worker
+    data = request.form.to_dict() if request.files else request.get_json() or {}
+    # only uploads saved below may be read and removed by the worker
+    data.pop("file_path", None)
+
+    kind = data.pop("kind", None)
+    if kind not in JOB_HANDLERS:
+        return jsonify({"error": f"Unknown job kind {kind!r}", "kinds": sorted(JOB_HANDLERS)}), 400
+    try:
+        priority = int(data.pop("priority", 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "priority must be an integer"}), 400
+
+    if request.files:
+        file = request.files.get("file")
+        if file is None or file.filename == "":
+            return jsonify({"error": "No selected file"}), 400
+        data["file_path"] = os.path.abspath(file_processor.save_upload(file))
+
+    job_id = job_queue.submit(kind, data, priority)
+    return jsonify({"job_id": job_id, "status": "queued"}), 202, {"Location": f"/jobs/{job_id}"}
+
+@app.route("/jobs", methods=["GET"])
+def get_jobs():
+    return jsonify({"jobs": job_queue.counts(), "workers": job_workers.status()})
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_queue.get(job_id, include_result=False)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def get_job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if job["status"] == DONE:
+        return jsonify(job["result"])
+    if job["status"] == CANCELLED:
+        return jsonify({"error": "Job was cancelled"}), 410
+    if job["status"] in FINISHED:
+        return jsonify({"error": job["error"]}), 500
+    return jsonify({"status": job["status"]}), 202, {"Retry-After": "5"}
+
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    status = job_queue.cancel(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify({"job_id": job_id, "status": status})
+
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    if job_queue.get(job_id, include_result=False) is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    def generate():
+        last = None
+        while True:
+            job = job_queue.get(job_id, include_result=False)
+            if (job["status"], job["cancel_requested"]) != last:
+                last = (job["status"], job["cancel_requested"])
+                yield job
+            if job["status"] in FINISHED:
+                return
+            time.sleep(0.5)
+
+    return stream_response(generate())
+
 @app.route("/", methods=["GET"])
 def hello():
     return "The server is working fine"
 
+@app.route("/health", methods=["GET"])
+def health():
+    components = models.status()
+    endpoints = {
+        endpoint: all(components[name]["ready"] for name in names)
+        for endpoint, names in ENDPOINT_MODELS.items()
+    }
+    ready = all(endpoints.values())
+    return jsonify({"ready": ready, "endpoints": endpoints, "models": components}), 200 if ready else 503
+
+@app.route("/models", methods=["GET"])
+def get_models():
+    return jsonify({"models": registry.memory_report()})
+
+@app.route("/scheduler", methods=["GET"])
+def get_scheduler_stats():
+    return jsonify({"schedulers": scheduler_stats()})
+
+@app.route("/cache", methods=["GET"])
+def get_cache_stats():
+    return jsonify(result_cache.stats())
+
 def clean_transcript(file_path):
     """Extracts and cleans transcript from a VTT file."""
     with open(file_path, "r", encoding="utf-8") as file:
@@ -0,0 +1,123 @@
+import os
+import pytest
+from Generator.jobs import JobQueue, JobContext, JobCancelled, run_job, _input_text, QUEUED, RUNNING, DONE, CANCELLED
+from Generator.main import FileProcessor
+
+class Files:
+    # Stands in for the worker's ModelLoader, which only needs to hand out the FileProcessor
+    def __init__(self, processor):
+        self.processor = processor
+
+    def get(self, name):
+        assert name == "files"
+        return self.processor
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+def test_claim_takes_highest_priority_then_oldest(queue):
+    low = queue.submit("mcq", {"input_text": "a"})
+    first = queue.submit("mcq", {"input_text": "b"}, priority=5)
+    second = queue.submit("mcq", {"input_text": "c"}, priority=5)
+
+    assert [queue.claim("host:1")["id"] for _ in range(3)] == [first, second, low]
+    assert queue.claim("host:1") is None
+    assert queue.get(first)["status"] == RUNNING
+    assert queue.get(first)["worker"] == "host:1"
+
+def test_claim_returns_payload(queue):
+    job_id = queue.submit("boolq", {"input_text": "text", "max_questions": 3})
+    assert queue.claim("host:1") == {"id": job_id, "kind": "boolq", "payload": {"input_text": "text", "max_questions": 3}}
+
+def test_cancel_queued_job(queue):
+    job_id = queue.submit("mcq", {})
+    assert queue.cancel(job_id) == CANCELLED
+    assert queue.get(job_id)["status"] == CANCELLED
+    assert queue.claim("host:1") is None
+    assert queue.cancel("missing") is None
+
+def test_cancel_running_job_stops_at_next_stage(queue):
+    job_id = queue.submit("mcq", {})
+    job = queue.claim("host:1")
+    assert queue.cancel(job_id) == RUNNING
+    assert queue.cancel_requested(job_id)
+
+    ctx = JobContext(queue, job_id)
+    with pytest.raises(JobCancelled):
+        with ctx.stage("generate"):
+            pass
+
+def test_run_job_records_cancellation(queue, monkeypatch):
+    from Generator import jobs
+
+    def handler(models, payload, ctx):
+        queue.cancel(job["id"])
+        with ctx.stage("generate"):
+            return {"output": []}
+
+    monkeypatch.setitem(jobs.JOB_HANDLERS, "test", handler)
+    queue.submit("test", {})
+    job = queue.claim("host:1")
+    run_job(queue, None, job)
+    assert queue.get(job["id"])["status"] == CANCELLED
+
+def test_run_job_stores_result(queue, monkeypatch):
+    from Generator import jobs
+
+    monkeypatch.setitem(jobs.JOB_HANDLERS, "test", lambda models, payload, ctx: {"output": payload["value"]})
+    queue.submit("test", {"value": 7})
+    job = queue.claim("host:1")
+    run_job(queue, None, job)
+    finished = queue.get(job["id"])
+    assert finished["status"] == DONE
+    assert finished["result"] == {"output": 7}
+
+def test_requeue_returns_jobs_of_dead_worker(queue):
+    job_id = queue.submit("mcq", {})
+    other = queue.submit("mcq", {})
+    assert queue.claim("host:1")["id"] == job_id
+    assert queue.claim("host:2")["id"] == other
+
+    queue.requeue("host:1")
+    assert queue.get(job_id)["status"] == QUEUED
+    assert queue.get(job_id)["worker"] is None
+    assert queue.get(other)["status"] == RUNNING
+    assert queue.claim("host:3")["id"] == job_id
+
+def test_input_text_ingests_and_removes_upload(queue, tmp_path):
+    processor = FileProcessor(str(tmp_path / "uploads"))
+    path = os.path.join(processor.upload_folder, "notes.txt")
+    with open(path, "w") as f:
+        f.write("uploaded text")
+
+    job_id = queue.submit("ingest", {"file_path": path})
+    assert _input_text(Files(processor), {"file_path": path}, JobContext(queue, job_id)) == "uploaded text"
+    assert not os.path.exists(path)
+
+def test_input_text_removes_upload_when_extraction_fails(queue, tmp_path, monkeypatch):
+    processor = FileProcessor(str(tmp_path / "uploads"))
+    path = os.path.join(processor.upload_folder, "broken.pdf")
+    with open(path, "w") as f:
+        f.write("not a pdf")
+
+    def fail(file_path):
+        raise RuntimeError("cannot parse")
+
+    monkeypatch.setattr(processor, "extract_text", fail)
+    job_id = queue.submit("ingest", {"file_path": path})
+    with pytest.raises(RuntimeError):
+        _input_text(Files(processor), {"file_path": path}, JobContext(queue, job_id))
+    assert not os.path.exists(path)
+
+def test_input_text_refuses_files_outside_upload_folder(queue, tmp_path):
+    processor = FileProcessor(str(tmp_path / "uploads"))
+    outside = tmp_path / "secret.txt"
+    outside.write_text("secret")
+    escaping = os.path.join(processor.upload_folder, "..", "secret.txt")
+
+    job_id = queue.submit("ingest", {})
+    for path in (str(outside), escaping):
+        with pytest.raises(ValueError):
+            _input_text(Files(processor), {"file_path": path}, JobContext(queue, job_id))
+    assert outside.read_text() == "secret"
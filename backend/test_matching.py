@@ -0,0 +1,61 @@
+import random
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from Generator.matching import OptionMatcher
+
+matcher = OptionMatcher()
+
+# Options of the kind /get_mcq produces, with the answers an extractive QA model would return
+options = [
+    ['Artificial intelligence', 'Machine learning', 'Deep learning', 'Robotics'],
+    ['neural networks', 'expert systems', 'speech recognition'],
+    ['self-correction', 'reasoning', 'learning', 'pattern recognition', 'data processing'],
+    ['machine vision', 'natural language processing'],
+    ['AI'],
+    ['computer systems', 'human intelligence processes', 'algorithms', 'predictions'],
+]
+answers = [
+    'machine learning', 'neural network', 'self correction', 'natural language processing', 'AI', 'algorithms that learn',
+]
+
+def pairwise_scores(question_options, answer):
+    # Scores one question at a time, fitting a character n-gram vocabulary on its own
+    # options and answer and comparing each option to the answer
+    vectors = CountVectorizer(analyzer="char_wb", ngram_range=(2, 4), lowercase=True).fit_transform(question_options + [answer])
+    return cosine_similarity(vectors[:-1], vectors[-1]).ravel()
+
+def tfidf_best_option(question_options, answer):
+    # The original per-question word TF-IDF matching of /get_mcq_answer
+    vectors = TfidfVectorizer().fit_transform(question_options + [answer]).toarray()
+    similarities = cosine_similarity(vectors[:-1], vectors[-1].reshape(1, -1)).flatten()
+    return question_options[similarities.argmax()]
+
+def test_scores_match_pairwise_scoring():
+    table = matcher.scores(options, answers)
+    assert table.shape == (len(options), max(len(o) for o in options))
+    for row, question_options, answer in zip(table, options, answers):
+        assert np.allclose(row[:len(question_options)], pairwise_scores(question_options, answer))
+        assert np.all(np.isneginf(row[len(question_options):]))
+
+def test_best_options_match_pairwise_scoring_on_shuffled_input():
+    rng = random.Random(42)
+    for _ in range(50):
+        order = rng.sample(range(len(options)), len(options))
+        shuffled = [rng.sample(options[i], len(options[i])) for i in order]
+        shuffled_answers = [answers[i] for i in order]
+        expected = [o[int(np.argmax(pairwise_scores(o, a)))] for o, a in zip(shuffled, shuffled_answers)]
+        assert matcher.best_options(shuffled, shuffled_answers) == expected
+
+def test_best_options_agree_with_tfidf_on_exact_answers():
+    for question_options in options:
+        for option in question_options:
+            assert matcher.best_options([question_options], [option]) == [tfidf_best_option(question_options, option)] == [option]
+
+def test_best_options_prefers_shared_stems():
+    # word TF-IDF sees no overlap between "network" and "networks"
+    assert matcher.best_options([['neural networks', 'expert systems']], ['neural network']) == ['neural networks']
+
+def test_best_options_without_options():
+    assert matcher.best_options([[], ['robotics']], ['x', 'robot']) == [None, 'robotics']
+    assert matcher.best_options([[]], ['x']) == [None]
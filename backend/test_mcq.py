@@ -0,0 +1,39 @@
+import random
+from similarity.normalized_levenshtein import NormalizedLevenshtein
+from Generator.mcq import are_words_distant, filter_useful_phrases
+
+normalized_levenshtein = NormalizedLevenshtein()
+
+# Keyphrases of the kind identify_keywords and find_similar_words produce
+phrases = [
+    'artificial intelligence', 'Artificial Intelligence', 'machine learning', 'machine learnings',
+    'deep learning', 'neural networks', 'neural network', 'speech recognition', 'natural language processing',
+    'expert systems', 'robotics', 'Robotics', 'data', 'privacy concerns', 'pattern recognition', 'AI', '',
+    'the simulation of human intelligence processes', 'computer systems', 'self-correction', 'self correction',
+]
+
+def pairwise_filter(phrase_keys, max_count):
+    # The original greedy filter, comparing each phrase against the kept list one pair at a time
+    filtered_phrases = []
+    if phrase_keys:
+        filtered_phrases.append(phrase_keys[0])
+        for ph in phrase_keys[1:]:
+            if are_words_distant(filtered_phrases, ph, 0.7, normalized_levenshtein):
+                filtered_phrases.append(ph)
+            if len(filtered_phrases) >= max_count:
+                break
+    return filtered_phrases
+
+def test_filter_useful_phrases_matches_pairwise_filter():
+    for max_count in range(len(phrases) + 1):
+        assert filter_useful_phrases(phrases, max_count, normalized_levenshtein) == pairwise_filter(phrases, max_count)
+
+def test_filter_useful_phrases_matches_pairwise_filter_on_shuffled_input():
+    rng = random.Random(42)
+    for _ in range(50):
+        shuffled = rng.sample(phrases, len(phrases))
+        max_count = rng.randint(1, 10)
+        assert filter_useful_phrases(shuffled, max_count, normalized_levenshtein) == pairwise_filter(shuffled, max_count)
+
+def test_filter_useful_phrases_empty():
+    assert filter_useful_phrases([], 4, normalized_levenshtein) == []
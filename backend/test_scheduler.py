@@ -0,0 +1,115 @@
+import threading
+import pytest
+import torch
+from Generator.scheduler import BatchScheduler
+
+PAD = 0
+
+class Config:
+    pad_token_id = PAD
+
+class EchoModel:
+    # Stands in for a seq2seq model: each output row is its input row with the padding
+    # stripped, tagged with the index of the sequence returned for it
+    def __init__(self):
+        self.config = Config()
+        self.calls = []
+
+    def generate(self, input_ids, attention_mask, num_return_sequences=1, **kwargs):
+        self.calls.append({"rows": input_ids.shape[0], "kwargs": dict(kwargs, num_return_sequences=num_return_sequences)})
+        outputs = []
+        for ids, mask in zip(input_ids, attention_mask):
+            for sequence in range(num_return_sequences):
+                outputs.append(torch.cat([ids[mask.bool()], torch.tensor([100 + sequence])]))
+        generated = torch.full((len(outputs), max(len(row) for row in outputs)), PAD, dtype=input_ids.dtype)
+        for i, row in enumerate(outputs):
+            generated[i, :len(row)] = row
+        return generated
+
+def pad(rows):
+    width = max(len(row) for row in rows)
+    input_ids = torch.tensor([row + [PAD] * (width - len(row)) for row in rows])
+    attention_mask = torch.tensor([[1] * len(row) + [0] * (width - len(row)) for row in rows])
+    return input_ids, attention_mask
+
+def strip(output):
+    return [token for token in output.tolist() if token != PAD]
+
+def run_concurrently(scheduler, requests):
+    results = [None] * len(requests)
+    barrier = threading.Barrier(len(requests))
+
+    def call(i, rows, kwargs):
+        input_ids, attention_mask = pad(rows)
+        barrier.wait()
+        results[i] = scheduler.generate(input_ids, attention_mask=attention_mask, **kwargs)
+
+    threads = [threading.Thread(target=call, args=(i, rows, kwargs)) for i, (rows, kwargs) in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_merged_batch_is_split_back_per_caller():
+    model = EchoModel()
+    scheduler = BatchScheduler(model, max_batch_size=16, max_wait_ms=200)
+    requests = [([[5, 6, 7], [8]], {}), ([[9, 10]], {}), ([[11], [12, 13, 14, 15], [16]], {})]
+
+    results = run_concurrently(scheduler, requests)
+    assert len(model.calls) == 1
+    assert model.calls[0]["rows"] == 6
+    for (rows, _), result in zip(requests, results):
+        assert [strip(output) for output in result] == [row + [100] for row in rows]
+
+def test_num_return_sequences_slices_each_caller_rows():
+    model = EchoModel()
+    scheduler = BatchScheduler(model, max_batch_size=16, max_wait_ms=200)
+    requests = [([[5, 6], [7]], {"num_return_sequences": 3}), ([[8, 9, 10]], {"num_return_sequences": 3})]
+
+    results = run_concurrently(scheduler, requests)
+    assert len(model.calls) == 1
+    for (rows, _), result in zip(requests, results):
+        assert len(result) == 3 * len(rows)
+        assert [strip(output) for output in result] == [row + [100 + sequence] for row in rows for sequence in range(3)]
+
+def test_padding_is_removed_before_rebatching():
+    model = EchoModel()
+    scheduler = BatchScheduler(model, max_batch_size=16, max_wait_ms=0)
+    # the padding of the caller's batch must not reach the model as tokens
+    input_ids, attention_mask = pad([[5], [6, 7, 8, 9]])
+    result = scheduler.generate(input_ids, attention_mask=attention_mask)
+    assert [strip(output) for output in result] == [[5, 100], [6, 7, 8, 9, 100]]
+
+def test_requests_with_different_kwargs_are_not_merged():
+    model = EchoModel()
+    scheduler = BatchScheduler(model, max_batch_size=16, max_wait_ms=200)
+    requests = [([[5, 6]], {"max_new_tokens": 32}), ([[7]], {"max_new_tokens": 64})]
+
+    results = run_concurrently(scheduler, requests)
+    assert len(model.calls) == 2
+    assert sorted(call["kwargs"]["max_new_tokens"] for call in model.calls) == [32, 64]
+    assert [strip(output) for output in results[0]] == [[5, 6, 100]]
+    assert [strip(output) for output in results[1]] == [[7, 100]]
+
+def test_batch_respects_max_batch_size():
+    model = EchoModel()
+    scheduler = BatchScheduler(model, max_batch_size=2, max_wait_ms=200)
+    requests = [([[5]], {}), ([[6]], {}), ([[7]], {})]
+
+    results = run_concurrently(scheduler, requests)
+    assert all(call["rows"] <= 2 for call in model.calls)
+    assert sum(call["rows"] for call in model.calls) == 3
+    assert [[strip(output) for output in result] for result in results] == [[[5, 100]], [[6, 100]], [[7, 100]]]
+
+def test_model_errors_are_raised_to_the_caller():
+    model = EchoModel()
+
+    def fail(**kwargs):
+        raise RuntimeError("out of memory")
+
+    model.generate = fail
+    scheduler = BatchScheduler(model, max_wait_ms=0)
+    input_ids, attention_mask = pad([[5]])
+    with pytest.raises(RuntimeError, match="out of memory"):
+        scheduler.generate(input_ids, attention_mask=attention_mask)
@@ -33,6 +33,34 @@ def test_get_mcq():
     print(f'/get_mcq Response: {response}')
     assert 'output' in response
 
+def test_get_mcq_incremental():
+    endpoint = '/get_mcq'
+    data = {
+        'input_text': input_text,
+        'max_questions': 5,
+        'document_id': 'test-document'
+    }
+    make_post_request(endpoint, data)
+    data['input_text'] = input_text + ' Robotics combines AI with mechanical engineering to build machines.'
+    response = make_post_request(endpoint, data)
+    print(f'/get_mcq incremental Response: {response}')
+    assert 'output' in response
+    assert response['document_id'] == 'test-document'
+    assert 0 <= response['reused'] <= len(response['output'])
+
+def test_get_mcq_stream():
+    endpoint = '/get_mcq/stream'
+    data = {
+        'input_text': input_text,
+        'max_questions': 5
+    }
+    headers = {'Content-Type': 'application/json'}
+    response = requests.post(f'{BASE_URL}{endpoint}', headers=headers, data=json.dumps(data), stream=True)
+    records = [json.loads(line) for line in response.iter_lines() if line]
+    print(f'/get_mcq/stream Response: {records}')
+    assert records[-1]['done']
+    assert all('question_statement' in r for r in records[:-1])
+
 def test_get_boolq():
     endpoint = '/get_boolq'
     data = {
@@ -102,6 +130,13 @@ def test_get_boolean_answer():
     print(f'/get_boolean_answer Response: {response}')
     assert 'output' in response
 
+def test_health():
+    endpoint = '/health'
+    response = requests.get(f'{BASE_URL}{endpoint}')
+    print(f'/health Response: {response.json()}')
+    assert response.status_code in (200, 503)
+    assert 'endpoints' in response.json()
+
 def make_post_request(endpoint, data):
     url = f'{BASE_URL}{endpoint}'
     headers = {'Content-Type': 'application/json'}
@@ -110,9 +145,12 @@ def make_post_request(endpoint, data):
 
 if __name__ == '__main__':
     test_get_mcq()
+    test_get_mcq_incremental()
+    test_get_mcq_stream()
     test_get_boolq()
     test_get_shortq()
     test_get_problems()
     test_root()
     test_get_answer()
     test_get_boolean_answer()
+    test_health()
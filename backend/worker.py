@@ -0,0 +1,9 @@
+# Job worker entry point: python worker.py --queue jobs.sqlite3
+# The runtime has to be configured before the Generator package imports transformers.
+import provision
+provision.configure_runtime()
+provision.check_assets_or_exit()
+from Generator.jobs import main
+
+if __name__ == "__main__":
+    main()